@@ -0,0 +1,247 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import polars as pl
+
+from Generator import DataProcessor, MetricPeriods, MetricSection
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BatchDataProcessor:
+    """Processes a whole fetch_data result into one polars frame.
+
+    The frame has one row per ISIN with the company overview columns, every
+    DataProcessor.METRIC_MAP key as a Float64 column and its reporting period in
+    '<key>_period'. The metric nodes of all companies are flattened into one long
+    frame and the METRIC_MAP candidates are picked with joins in DataProcessor's
+    search order, so the validation rules of DataProcessor.calculate_* run as
+    column expressions over all companies at once.
+    """
+
+    OVERVIEW_COLUMNS = ['legal_name', 'sector', 'industry', 'country']
+    SECTIONS = ['ratios', 'profile']
+    METRIC_SECTIONS = {
+        'financial_metrics': DataProcessor.FINANCIAL_METRICS,
+        'valuation_ratios': DataProcessor.VALUATION_RATIOS,
+        'efficiency_metrics': DataProcessor.EFFICIENCY_METRICS
+    }
+    METRIC_IDS = frozenset(metric_id for ids in DataProcessor.METRIC_MAP.values() for metric_id in ids)
+    PERIODS = {metric_id: DataProcessor._get_period(metric_id) for metric_id in METRIC_IDS}
+    NODE_SCHEMA = {'isin': pl.Utf8, 'section': pl.UInt8, 'position': pl.UInt32, 'id': pl.Utf8, 'raw': pl.Utf8}
+
+    def __init__(self, fetched_data: Dict[str, Dict[str, Any]]):
+        self.raw_data = fetched_data
+        self.frame = None
+        self.overviews = {}
+        self.candidates = None  # (isin, section, position, id, raw, key, rank) of every METRIC_MAP id found
+
+    @staticmethod
+    def _ratio_nodes(ratios) -> Optional[List[Tuple[Any, Any]]]:
+        """(id, value) of every id node of a Refinitiv ratios payload in document order.
+
+        None when the payload is not laid out as data.currentRatios.ratiosGroups[].items[]
+        with flat items, the order of such payloads needs the full depth-first walk.
+        """
+        try:
+            current = ratios['data']['currentRatios']
+            groups = current['ratiosGroups']
+        except (KeyError, IndexError, TypeError):
+            return None
+        for node, child in ((ratios, 'data'), (ratios['data'], 'currentRatios'), (current, 'ratiosGroups')):
+            if not isinstance(node, dict) or 'id' in node or any(
+                    isinstance(value, (dict, list)) for key, value in node.items() if key != child):
+                return None
+        if not isinstance(groups, list):
+            return None
+
+        nodes = []
+        for group in groups:
+            if isinstance(group, list):
+                return None
+            if not isinstance(group, dict):
+                continue
+            items = group.get('items')
+            if isinstance(items, dict) or any(
+                    isinstance(value, (dict, list)) for key, value in group.items() if key != 'items'):
+                return None
+            if 'id' in group:
+                nodes.append((group['id'], group.get('value')))
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if isinstance(item, dict):
+                    if any(isinstance(value, (dict, list)) for value in item.values()):
+                        return None
+                    if 'id' in item:
+                        nodes.append((item['id'], item.get('value')))
+                elif isinstance(item, list):
+                    return None
+        return nodes
+
+    def _metric_nodes(self, section_data) -> List[Tuple[int, Any, Any]]:
+        """(position, id, value) of the METRIC_MAP ids in one raw section"""
+        nodes = self._ratio_nodes(section_data)
+        if nodes is not None:
+            try:
+                return [(position, metric_id, value) for position, (metric_id, value) in enumerate(nodes)
+                        if metric_id in self.METRIC_IDS]
+            except TypeError:
+                pass  # Unhashable ids, let the index skip them
+        index = DataProcessor._build_metric_index(section_data)
+        return [(position, metric_id, value) for metric_id, (position, value, _) in index.items()
+                if metric_id in self.METRIC_IDS]
+
+    def _candidates(self) -> pl.DataFrame:
+        """First occurrence of every METRIC_MAP id per company and section, joined to its keys"""
+        columns = {name: [] for name in self.NODE_SCHEMA}
+        for isin, payload in self.raw_data.items():
+            self.overviews[isin] = DataProcessor.company_overview(isin, payload)
+            for section_number, section in enumerate(self.SECTIONS):
+                section_data = payload.get(section, {}) if isinstance(payload, dict) else {}
+                for position, metric_id, value in self._metric_nodes(section_data):
+                    columns['isin'].append(isin)
+                    columns['section'].append(section_number)
+                    columns['position'].append(position)
+                    columns['id'].append(metric_id)
+                    columns['raw'].append(None if value is None else str(value))
+
+        keys = pl.DataFrame(
+            [(key, metric_id, rank) for key, ids in DataProcessor.METRIC_MAP.items()
+             for rank, metric_id in enumerate(ids)],
+            schema={'key': pl.Utf8, 'id': pl.Utf8, 'rank': pl.UInt8}, orient='row'
+        )
+        return (pl.DataFrame(columns, schema=self.NODE_SCHEMA)
+                .unique(subset=['isin', 'section', 'id'], keep='first', maintain_order=True)
+                .join(keys, on='id'))
+
+    def _extract(self) -> pl.DataFrame:
+        """Raw metric values and periods for every company as string columns.
+
+        Like DataProcessor._find_metric, the earliest candidate of a section answers
+        and a null value there hands the lookup to the next section.
+        """
+        self.candidates = self._candidates()
+        found = (self.candidates.sort(['isin', 'key', 'section', 'position'])
+                 .group_by(['isin', 'key', 'section'], maintain_order=True).first()
+                 .filter(pl.col('raw').is_not_null())
+                 .group_by(['isin', 'key'], maintain_order=True).first()
+                 .with_columns(pl.col('id').replace(self.PERIODS).alias('period')))
+
+        frame = pl.DataFrame(
+            [[isin] + [overview[name] for name in self.OVERVIEW_COLUMNS] for isin, overview in self.overviews.items()],
+            schema={name: pl.Utf8 for name in ['isin'] + self.OVERVIEW_COLUMNS}, orient='row'
+        )
+        if found.height:
+            frame = (frame
+                     .join(found.pivot(values='raw', index='isin', columns='key'), on='isin', how='left')
+                     .join(found.pivot(values='period', index='isin', columns='key')
+                           .rename(lambda name: name if name == 'isin' else f'{name}_period'), on='isin', how='left'))
+        columns = [pl.col('isin')] + [pl.col(name) for name in self.OVERVIEW_COLUMNS]
+        for key in DataProcessor.METRIC_MAP:
+            period = f'{key}_period'
+            columns.append(pl.col(key) if key in frame.columns else pl.lit(None, dtype=pl.Utf8).alias(key))
+            columns.append(pl.col(period).fill_null('N/A') if period in frame.columns else pl.lit('N/A').alias(period))
+        return frame.select(columns)
+
+    @staticmethod
+    def _numeric(key: str) -> pl.Expr:
+        return pl.col(key).str.replace_all(',', '', literal=True).cast(pl.Float64, strict=False)
+
+    @staticmethod
+    def _null_when(condition: pl.Expr, value: pl.Expr) -> pl.Expr:
+        return pl.when(condition).then(pl.lit(None, dtype=pl.Float64)).otherwise(value)
+
+    def _metric_expressions(self):
+        expressions = []
+        for key in DataProcessor.FINANCIAL_METRICS:
+            value = self._numeric(key)
+            if key.endswith('_per_share'):
+                value = self._null_when(value < 0, value)
+            elif key == 'eps':  # Unrealistic EPS values
+                value = self._null_when(value.abs() > 1000, value)
+            expressions.append(value.alias(key))
+
+        for key in DataProcessor.VALUATION_RATIOS:
+            value = self._numeric(key)
+            if key != 'pe_ratio':  # Unusual P/E ratios are only reported
+                value = self._null_when(value < 0, value)
+            expressions.append(value.alias(key))
+
+        for key in DataProcessor.EFFICIENCY_METRICS:
+            # Convert percentages to decimals
+            percentage = pl.col(key).str.strip_chars('%').cast(pl.Float64, strict=False) / 100
+            value = pl.when(pl.col(key).str.contains('%', literal=True)).then(percentage).otherwise(self._numeric(key))
+            expressions.append(value.alias(key))
+        return expressions
+
+    def _log_validation(self, raw: pl.DataFrame):
+        per_share = [key for key in DataProcessor.FINANCIAL_METRICS if key.endswith('_per_share')]
+        negative_ratios = [key for key in DataProcessor.VALUATION_RATIOS if key != 'pe_ratio']
+        counts = raw.select(
+            pl.sum_horizontal([(self._numeric(key) < 0).sum() for key in per_share]).alias('negative_per_share'),
+            (self._numeric('eps').abs() > 1000).sum().alias('suspicious_eps'),
+            ((self._numeric('pe_ratio') < 0) | (self._numeric('pe_ratio') > 1000)).sum().alias('unusual_pe'),
+            pl.sum_horizontal([(self._numeric(key) < 0).sum() for key in negative_ratios]).alias('negative_ratios'),
+        ).row(0, named=True)
+        for check, count in counts.items():
+            if count:
+                logger.warning(f"Batch validation: {count} x {check.replace('_', ' ')}")
+
+    def process(self) -> pl.DataFrame:
+        raw = self._extract()
+        self._log_validation(raw)
+        self.frame = raw.with_columns(self._metric_expressions())
+        logger.info(f"Batch processed {self.frame.height} companies")
+        return self.frame
+
+    def periods(self) -> pl.DataFrame:
+        """(isin, key, period, value) of every valid reporting period, as DataProcessor.extract_metric_periods.
+
+        Ratios take precedence over profile and the first candidate id wins a period.
+        """
+        if self.candidates is None:
+            self.process()
+        raw, key, value = pl.col('raw'), pl.col('key'), pl.col('value')
+        percentage = key.is_in(DataProcessor.EFFICIENCY_METRICS) & raw.str.contains('%', literal=True)
+        per_share = [name for name in DataProcessor.FINANCIAL_METRICS if name.endswith('_per_share')]
+        negative_ratios = [name for name in DataProcessor.VALUATION_RATIOS if name != 'pe_ratio']
+        invalid = (((key.is_in(per_share) | key.is_in(negative_ratios)) & (value < 0))
+                   | ((key == 'eps') & (value.abs() > 1000)))
+        period_rank = {period: rank for rank, period in enumerate(DataProcessor.PERIOD_ORDER)}
+        return (self.candidates
+                .with_columns(
+                    pl.when(percentage)
+                    .then(raw.str.strip_chars('%').cast(pl.Float64, strict=False) / 100)
+                    .otherwise(raw.str.replace_all(',', '', literal=True).cast(pl.Float64, strict=False))
+                    .alias('value'),
+                    pl.col('id').replace(self.PERIODS).alias('period'))
+                .filter(value.is_not_null() & ~invalid)
+                .sort(['isin', 'key', 'section', 'rank'])
+                .unique(subset=['isin', 'key', 'period'], keep='first', maintain_order=True)
+                .with_columns(pl.col('period').replace(period_rank, default=len(period_rank),
+                                                       return_dtype=pl.UInt8).alias('period_rank'))
+                .sort(['isin', 'key', 'period_rank'], maintain_order=True)
+                .select(['isin', 'key', 'period', 'value']))
+
+    def processed_data(self) -> Dict[str, Dict[str, Any]]:
+        """{isin: DataProcessor.processed_data} built from the frame and periods()"""
+        if self.frame is None:
+            self.process()
+        periods = {}
+        for isin, key, period, value in self.periods().iter_rows():
+            periods.setdefault(isin, {}).setdefault(key, {})[period] = value
+
+        processed = {}
+        for row in self.frame.iter_rows(named=True):
+            isin = row['isin']
+            data = {'company_overview': self.overviews[isin]}
+            for section, keys in self.METRIC_SECTIONS.items():
+                data[section] = MetricSection({key: (row[key], row[f'{key}_period']) for key in keys})
+            company_periods = periods.get(isin, {})
+            data['metric_periods'] = MetricPeriods({key: company_periods.get(key, {})
+                                                    for key in DataProcessor.METRIC_MAP})
+            processed[isin] = data
+        return processed
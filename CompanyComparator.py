@@ -1,4 +1,4 @@
-import json
+import Json_Codec
 from tkinter import messagebox
 import logging as logger
 from Generator import PDFGenerator, APIHandler
@@ -10,8 +10,7 @@ class CompanyComparator:
 
     def load_company_data(self, file_path='compiled_company_data.json'):
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
+            return Json_Codec.load(file_path)
         except FileNotFoundError:
             messagebox.showerror("Error", "No company data found. Generate reports first.")
             return []
@@ -0,0 +1,129 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import Json_Codec
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """Persistent key/value cache backed by a single sqlite file.
+
+    Entries live in a namespace (e.g. 'profile', 'ratios') and expire after the
+    TTL configured for that namespace. When more than max_entries are stored the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = 'degiro_cache.sqlite', default_ttl: float = 24 * 3600,
+                 ttl_by_namespace: Dict[str, float] = None, max_entries: int = 5000):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.ttl_by_namespace = dict(ttl_by_namespace or {})
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+
+    def ttl_for(self, namespace: str) -> float:
+        return self.ttl_by_namespace.get(namespace, self.default_ttl)
+
+    def set_ttl(self, namespace: str, ttl: float):
+        self.ttl_by_namespace[namespace] = ttl
+
+    def get(self, namespace: str, key: str) -> Any:
+        """Return the cached value, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_for(namespace):
+                self.misses += 1
+                logger.debug(f"Cache miss: {namespace}/{key}")
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        logger.debug(f"Cache hit: {namespace}/{key}")
+        return Json_Codec.loads(row[0])
+
+    def age(self, namespace: str, key: str) -> float:
+        """Seconds since the entry was stored, or None when it is not cached"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return None if row is None else time.time() - row[0]
+
+    def set(self, namespace: str, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, Json_Codec.dumps(value), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            logger.info(f"Cache evicted {count - self.max_entries} least recently used entries")
+
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        """All unexpired (key, value) pairs of a namespace, without touching their access time"""
+        cutoff = time.time() - self.ttl_for(namespace)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM entries WHERE namespace = ? AND created >= ?",
+                (namespace, cutoff)
+            ).fetchall()
+        return [(key, Json_Codec.loads(value)) for key, value in rows]
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            self._conn.commit()
+
+    def clear(self, namespace: str = None):
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -3,15 +3,24 @@ from tkinter.scrolledtext import ScrolledText
 from CompanyComparator import CompanyComparator
 
 from degiro_connector.trading.models.credentials import Credentials
+import hashlib
 import logging
 import os
 from dotenv import load_dotenv, set_key, unset_key
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext, simpledialog, StringVar
 import threading
-import json
 from JSON_Grabber import DegiroConnector
+from Disk_Cache import DiskCache
+from Watchlist_Prefetcher import WatchlistPrefetcher
+from Incremental_Processor import IncrementalProcessor
+from Batch_Processor import BatchDataProcessor
+from Screener import Screener
+from Sector_Index import SectorPercentileIndex
+from Interpretation_Engine import InterpretationEngine
+import Json_Codec
 from Generator import DataProcessor, PDFGenerator, APIHandler
+from LLM_Metrics import LLMMetrics
 import traceback
 import keyring
 from datetime import datetime
@@ -130,6 +139,7 @@ class ETFDesigner:
         self.window.geometry("800x600")
         self.degiro_connector = degiro_connector
         self.etf_holdings = {}  # {company_name: percentage}
+        self.search_generation = 0
         self.setup_ui()
 
     def setup_ui(self):
@@ -184,10 +194,25 @@ class ETFDesigner:
     def search_companies(self):
         query = self.search_entry.get()
         if query:
-            results = self.degiro_connector.search_companies(query)
             self.results_list.delete(0, tk.END)
-            for company in results:
-                self.results_list.insert(tk.END, f"{company['name']} ({company['isin']})")
+            self.search_generation += 1
+            threading.Thread(target=self._search_companies_thread, args=(query, self.search_generation),
+                             daemon=True).start()
+
+    def _search_companies_thread(self, query, generation):
+        try:
+            # Stop paging as soon as a newer search replaces this one
+            for page in self.degiro_connector.iter_search_pages(
+                    query, max_results=200, stop_when=lambda page: generation != self.search_generation):
+                self.window.after(0, self._append_search_results, page, generation)
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+
+    def _append_search_results(self, page, generation):
+        if generation != self.search_generation:
+            return
+        for company in page:
+            self.results_list.insert(tk.END, f"{company['name']} ({company['isin']})")
 
     def add_to_holdings(self, event):
         selection = self.results_list.get(self.results_list.curselection())
@@ -226,8 +251,7 @@ class ETFDesigner:
         )
 
         if filename:
-            with open(filename, 'w') as f:
-                json.dump(etf_data, f, indent=4)
+            Json_Codec.dump(etf_data, filename, indent=True)
 
 
 class GUIController:
@@ -237,9 +261,24 @@ class GUIController:
         self.master.title("Company Financial Report Generator")
         self.master.geometry("600x500")
         self.degiro_connector = None
+        self.prefetcher = None
         self.selected_companies = []
+        self.search_generation = 0
         self.use_perplexity_api = tk.BooleanVar(value=True)
+        self.force_refresh_data = tk.BooleanVar(value=False)
+        self.bypass_response_cache = tk.BooleanVar(value=False)
         self.advanced_settings_window = None
+        self.screener_window = None
+        self.screener = None
+        self.screener_error = None
+        self.streaming_company = None
+        # Fundamentals change at most daily, profiles far less often
+        self.payload_cache = DiskCache('degiro_cache.sqlite',
+                                       ttl_by_namespace={'profile': 7 * 24 * 3600, 'ratios': 24 * 3600})
+        # Processed sections are stored next to the payloads and reused while their inputs are unchanged
+        self.incremental_processor = IncrementalProcessor(self.payload_cache)
+        # Peer distributions behind the sector-relative interpretations in reports
+        self.sector_index = SectorPercentileIndex()
 
         main_frame = ttk.Frame(self.master, padding="10")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -251,6 +290,7 @@ class GUIController:
 
         self.load_saved_credentials()
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.master.after(0, self.resume_saved_session)
         self.console_frame.grid_columnconfigure(0, weight=1)
         self.console_frame.grid_rowconfigure(0, weight=1)
         self.log_queue = setup_logging()
@@ -287,28 +327,32 @@ class GUIController:
                 messagebox.showerror("Error", "Please select at least two companies for comparison")
                 return
 
-            # Fetch data for all selected companies
+            # Fetch data for all selected companies in one concurrent batch
+            isins = [company.split('(')[1].split(')')[0] for company in self.selected_companies]
+            all_data = self.degiro_connector.fetch_data(isins, force_refresh=self.force_refresh_data.get())
+            batch = BatchDataProcessor(all_data)
+            self.sector_index.update_frame(batch.process())
+            self.sector_index.save()
+            processed = batch.processed_data()
+
             companies_data = []
             for company in self.selected_companies:
                 company_name = company.split('(')[0].strip()
                 isin = company.split('(')[1].split(')')[0]
 
-                data = self.degiro_connector.fetch_data([isin])
-                data_processor = DataProcessor(data)
-                data_processor.process_data()
-
                 companies_data.append({
                     'company_name': company_name,
                     'isin': isin,
-                    'financial_data': data_processor.processed_data
+                    'financial_data': processed[isin]
                 })
 
             # Save compiled data
-            with open('compiled_company_data.json', 'w') as f:
-                json.dump(companies_data, f, indent=4)
+            Json_Codec.dump(companies_data, 'compiled_company_data.json')
 
             # Generate comparison report through CompanyComparator
             comparator = CompanyComparator()
+            comparator.api_handler.use_response_cache = not self.bypass_response_cache.get()
+            APIHandler.metrics().start_run("comparison")
             success = comparator.generate_comparison_report(companies_data)
 
             if success:
@@ -327,12 +371,30 @@ class GUIController:
                 record = self.log_queue.get_nowait()
                 formatted_message = self.queue_handler.format(record)
                 self.console_text.config(state=tk.NORMAL)
+                if self.streaming_company is not None:
+                    # Finish the line of streamed text before the log message
+                    self.console_text.insert(tk.END, '\n')
+                    self.streaming_company = None
                 self.console_text.insert(tk.END, formatted_message + '\n')
                 self.console_text.config(state=tk.DISABLED)
                 self.console_text.see(tk.END)
         except queue.Empty:
             self.master.after(100, self.frame_process_queue)
 
+    def show_streamed_text(self, company_name, text):
+        """Called from worker threads with each streamed piece of an AI analysis"""
+        self.master.after(0, self._append_streamed_text, company_name, text)
+
+    def _append_streamed_text(self, company_name, text):
+        # Concurrent streams interleave, so label the text whenever the company changes
+        if company_name != self.streaming_company:
+            self.streaming_company = company_name
+            text = f"\n[{company_name}] {text}"
+        self.console_text.config(state=tk.NORMAL)
+        self.console_text.insert(tk.END, text)
+        self.console_text.config(state=tk.DISABLED)
+        self.console_text.see(tk.END)
+
     def dropdown_value_changed(self):
         print("changed")
 
@@ -400,6 +462,16 @@ class GUIController:
         settings_button.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E))
         ToolTip(settings_button, "Configure API settings and prompts")
 
+        self.force_refresh_checkbox = ttk.Checkbutton(quick_settings_frame, text="Force refresh DeGiro data",
+                                                      variable=self.force_refresh_data)
+        self.force_refresh_checkbox.grid(row=5, column=0, columnspan=3, sticky=tk.W)
+        ToolTip(self.force_refresh_checkbox, "Ignore cached company data and download it again from DeGiro")
+
+        self.bypass_cache_checkbox = ttk.Checkbutton(quick_settings_frame, text="Bypass AI response cache",
+                                                     variable=self.bypass_response_cache)
+        self.bypass_cache_checkbox.grid(row=6, column=0, columnspan=3, sticky=tk.W)
+        ToolTip(self.bypass_cache_checkbox, "Request a fresh AI analysis instead of reusing the stored one")
+
 
         # Core Frame (Center)
         core_frame = ttk.Frame(main_frame)
@@ -470,6 +542,10 @@ class GUIController:
         compare_button.pack(side=tk.LEFT, padx=5)
         ToolTip(compare_button, "Compare financial metrics between selected companies")
 
+        screener_button = ttk.Button(self.button_frame, text="Screener", command=self.show_screener)
+        screener_button.pack(side=tk.LEFT)
+        ToolTip(screener_button, "Filter and rank all cached companies by their fundamentals")
+
         # Configure grid weights
         core_frame.columnconfigure(1, weight=1)
         core_frame.rowconfigure(1, weight=1)
@@ -535,6 +611,7 @@ class GUIController:
         self.selected_companies.pop(index)
         self.selected_companies_list.delete(index)
         self.update_delete_buttons()
+        self.update_watchlist()
 
     def remove_company(self):
         selection = self.selected_companies_list.curselection()
@@ -544,9 +621,12 @@ class GUIController:
 
 
     def on_closing(self):
+        self.stop_prefetcher()
+        self.incremental_processor.shutdown()
         if self.degiro_connector:
             try:
-                self.degiro_connector.disconnect()
+                # Keep the session alive so the next start can skip the login
+                self.degiro_connector.disconnect(keep_session=True)
             except:
                 pass
         self.master.destroy()
@@ -698,6 +778,47 @@ class GUIController:
             other_settings = ttk.Frame(notebook)
             notebook.add(other_settings, text='Other settings')
 
+            # AI usage: tokens, latency, cache hits and errors of the Perplexity calls
+            usage_frame = ttk.LabelFrame(other_settings, text="AI Usage")
+            usage_frame.grid(row=0, column=0, sticky='nsew', padx=5, pady=5)
+
+            ttk.Label(usage_frame, text="Group by:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+            group_by_var = tk.StringVar(value='day')
+            group_by_box = ttk.Combobox(usage_frame, textvariable=group_by_var, state='readonly',
+                                        values=list(LLMMetrics.GROUPINGS), width=8)
+            group_by_box.grid(row=0, column=1, sticky='w', padx=5, pady=5)
+            ToolTip(group_by_box, "Total the calls per calendar day or per batch of reports")
+
+            usage_tree = ttk.Treeview(usage_frame, columns=LLMMetrics.SUMMARY_COLUMNS, show="headings", height=15)
+            for column in LLMMetrics.SUMMARY_COLUMNS:
+                usage_tree.heading(column, text=column.replace('_', ' ').capitalize())
+                usage_tree.column(column, width=120 if column in ('period', 'model') else 70, anchor='w')
+            usage_tree.grid(row=1, column=0, columnspan=4, sticky='nsew', padx=5, pady=5)
+            ToolTip(usage_tree, "Latencies only include calls answered by the API, not cache hits or errors")
+
+            def refresh_usage():
+                self.show_llm_metrics(usage_tree, group_by_var.get())
+
+            group_by_box.bind('<<ComboboxSelected>>', lambda event: refresh_usage())
+            ttk.Button(usage_frame, text="Refresh", command=refresh_usage).grid(row=0, column=2, padx=5)
+
+            export_frame = ttk.Frame(usage_frame)
+            export_frame.grid(row=2, column=0, columnspan=4, sticky='we', padx=5, pady=5)
+            export_summary_button = ttk.Button(export_frame, text="Export Summary CSV",
+                                               command=lambda: self.export_llm_metrics(group_by_var.get()))
+            export_summary_button.pack(side='left')
+            ToolTip(export_summary_button, "Save the totals shown above to a CSV file")
+            export_calls_button = ttk.Button(export_frame, text="Export All Calls CSV",
+                                             command=self.export_llm_metrics)
+            export_calls_button.pack(side='left', padx=5)
+            ToolTip(export_calls_button, "Save every recorded call to a CSV file")
+
+            other_settings.columnconfigure(0, weight=1)
+            other_settings.rowconfigure(0, weight=1)
+            usage_frame.columnconfigure(3, weight=1)
+            usage_frame.rowconfigure(1, weight=1)
+            refresh_usage()
+
 
         other_settings_tab()
 
@@ -754,6 +875,34 @@ class GUIController:
         text_widget.delete('1.0', tk.END)
         text_widget.insert(tk.END, default_prompts.get(prompt_type, ''))
 
+    def show_llm_metrics(self, tree, group_by):
+        tree.delete(*tree.get_children())
+        for row in APIHandler.metrics().summary(group_by):
+            values = []
+            for column in LLMMetrics.SUMMARY_COLUMNS:
+                value = row[column]
+                if column in ('avg_latency', 'max_latency'):
+                    value = '' if value is None else f"{value:.1f}s"
+                values.append(value)
+            tree.insert('', tk.END, values=values)
+
+    def export_llm_metrics(self, group_by=None):
+        """Save the per-period summary, or every call when group_by is None, as CSV"""
+        filename = filedialog.asksaveasfilename(
+            parent=self.advanced_settings_window,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")],
+            initialfile=f"ai_usage_by_{group_by}.csv" if group_by else "ai_usage_calls.csv"
+        )
+        if not filename:
+            return
+        try:
+            rows = APIHandler.metrics().export_csv(filename, group_by)
+            messagebox.showinfo("Export", f"Exported {rows} rows to {filename}", parent=self.advanced_settings_window)
+        except Exception as e:
+            logger.error(f"Error exporting AI usage: {e}")
+            messagebox.showerror("Error", f"Failed to export AI usage: {e}", parent=self.advanced_settings_window)
+
     def close_advanced_settings(self):
         self.advanced_settings_window.destroy()
         self.advanced_settings_window = None
@@ -761,6 +910,120 @@ class GUIController:
     def on_double_click(self, event):
         self.add_company()
 
+    def show_screener(self):
+        if self.screener_window is not None:
+            self.screener_window.lift()
+            return
+
+        self.screener_window = tk.Toplevel(self.master)
+        self.screener_window.title("Screener")
+        self.screener_window.geometry("600x450")
+        self.screener_window.protocol("WM_DELETE_WINDOW", self.close_screener)
+        window = self.screener_window
+
+        ttk.Label(window, text="Filter:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
+        self.screen_filter_entry = ttk.Entry(window)
+        self.screen_filter_entry.insert(0, "pe_ratio < 15 and operating_margin > 20")
+        self.screen_filter_entry.grid(row=0, column=1, columnspan=3, sticky='we', padx=5, pady=5)
+        self.screen_filter_entry.bind('<Return>', lambda event: self.run_screen())
+        ToolTip(self.screen_filter_entry, "Conditions on metric names, e.g. pe_ratio < 15 and sector in ['Technology']")
+
+        ttk.Label(window, text="Rank by:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        self.screen_order_var = tk.StringVar(value='free_cash_flow_margin')
+        ttk.Combobox(window, textvariable=self.screen_order_var, state='readonly',
+                     values=[''] + list(DataProcessor.METRIC_MAP)).grid(row=1, column=1, sticky='we', padx=5, pady=5)
+        self.screen_ascending = tk.BooleanVar(value=False)
+        ttk.Checkbutton(window, text="Lowest first", variable=self.screen_ascending).grid(row=1, column=2, sticky='w')
+        ttk.Button(window, text="Run", command=self.run_screen).grid(row=1, column=3, padx=5)
+
+        self.screen_results = tk.Listbox(window, selectmode=tk.EXTENDED)
+        self.screen_results.grid(row=2, column=0, columnspan=4, sticky='nsew', padx=5, pady=5)
+        self.screen_results.bind('<Double-1>', lambda event: self.add_screen_results())
+        ToolTip(self.screen_results, "Double-click or use the buttons below to add companies to your selection")
+
+        buttons = ttk.Frame(window)
+        buttons.grid(row=3, column=0, columnspan=4, sticky='we', padx=5, pady=5)
+        ttk.Button(buttons, text="Add Selected", command=self.add_screen_results).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Add All", command=lambda: self.add_screen_results(all_results=True)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Reload Cache", command=self.load_screener).pack(side=tk.RIGHT)
+        self.screen_status = ttk.Label(window, text="")
+        self.screen_status.grid(row=4, column=0, columnspan=4, sticky='w', padx=5)
+
+        window.columnconfigure(1, weight=1)
+        window.rowconfigure(2, weight=1)
+        self.screen_companies = []
+        if self.screener is None:
+            self.load_screener()
+
+    def close_screener(self):
+        self.screener_window.destroy()
+        self.screener_window = None
+
+    def load_screener(self):
+        """Rebuild the screening frame from the payload cache in the background"""
+        self.screen_status.config(text="Loading cached companies...")
+        self.screener_error = None
+
+        def load():
+            try:
+                screener = Screener.from_cache(self.payload_cache)
+                # The whole cached universe also feeds the peer distributions
+                self.sector_index.update_frame(screener.frame)
+                self.sector_index.save()
+            except Exception as e:
+                logger.error(f"Failed to load screener: {e}")
+                self.master.after(0, lambda message=str(e): self._screener_failed(message))
+                return
+            self.master.after(0, lambda: self._screener_loaded(screener))
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def _screener_loaded(self, screener):
+        self.screener = screener
+        if self.screener_window is not None:
+            self.screen_status.config(text=f"{screener.frame.height} cached companies")
+
+    def _screener_failed(self, message):
+        self.screener_error = message
+        if self.screener_window is not None:
+            self.screen_status.config(text="Loading cached companies failed, use Reload Cache to retry")
+            messagebox.showerror("Screener", f"Failed to load the cached companies: {message}",
+                                 parent=self.screener_window)
+
+    def run_screen(self):
+        if self.screener is None and self.screener_error is not None:
+            messagebox.showerror("Screener", f"The cached companies could not be loaded: {self.screener_error}",
+                                 parent=self.screener_window)
+            return
+        if self.screener is None:
+            messagebox.showinfo("Screener", "The cached companies are still loading", parent=self.screener_window)
+            return
+        order_by = self.screen_order_var.get() or None
+        try:
+            result = self.screener.screen(self.screen_filter_entry.get(), order_by,
+                                          descending=not self.screen_ascending.get())
+        except ValueError as e:
+            messagebox.showerror("Screener", str(e), parent=self.screener_window)
+            return
+
+        self.screen_results.delete(0, tk.END)
+        self.screen_companies = []
+        for row in result.iter_rows(named=True):
+            company = f"{row['legal_name']} ({row['isin']})"
+            self.screen_companies.append(company)
+            value = row[order_by] if order_by else None
+            self.screen_results.insert(tk.END, company if value is None else f"{company}  {order_by}={value:.2f}")
+        self.screen_status.config(text=f"{result.height} matches out of {self.screener.frame.height} cached companies")
+
+    def add_screen_results(self, all_results=False):
+        indices = range(len(self.screen_companies)) if all_results else self.screen_results.curselection()
+        for index in indices:
+            company = self.screen_companies[index]
+            if company not in self.selected_companies:
+                self.selected_companies.append(company)
+                self.selected_companies_list.insert(tk.END, company)
+        self.update_watchlist()
+
     def connect_to_degiro(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
@@ -768,20 +1031,23 @@ class GUIController:
         if username and password:
             try:
                 # First attempt: with 2FA
-                self.degiro_connector = DegiroConnector(prompt_for_2fa_callback=self.prompt_for_2fa)
+                self.degiro_connector = DegiroConnector(prompt_for_2fa_callback=self.prompt_for_2fa,
+                                                        cache=self.payload_cache)
                 if self.degiro_connector.connect(username, password):
                     logger.info("Connected to Degiro successfully with 2FA")
                     self.connection_status.config(text="Connected", foreground="green")
                     self.logout_button.config(state=tk.NORMAL)
+                    self.start_prefetcher()
                     return
 
                 # Second attempt: without 2FA
                 logger.info("2FA connection failed, attempting without 2FA")
-                self.degiro_connector = DegiroConnector(prompt_for_2fa_callback=None)
+                self.degiro_connector = DegiroConnector(prompt_for_2fa_callback=None, cache=self.payload_cache)
                 if self.degiro_connector.connect(username, password):
                     logger.info("Connected to Degiro successfully without 2FA")
                     self.connection_status.config(text="Connected", foreground="green")
                     self.logout_button.config(state=tk.NORMAL)
+                    self.start_prefetcher()
                     return
 
                 # If both attempts fail
@@ -799,11 +1065,34 @@ class GUIController:
             logger.error("Username and password are required")
             messagebox.showerror("Input Error", "Username and password are required")
 
+    def resume_saved_session(self):
+        """Connect on startup when a DeGiro session from a previous run was kept"""
+        saved_session = keyring.get_password(DegiroConnector.KEYRING_SERVICE, DegiroConnector.SESSION_KEYRING_KEY)
+        if saved_session and self.username_entry.get() and self.password_entry.get():
+            self.connect_to_degiro()
+
+    def start_prefetcher(self):
+        """Keep cached fundamentals for the watchlist warm in the background"""
+        self.stop_prefetcher()
+        self.prefetcher = WatchlistPrefetcher(self.degiro_connector)
+        self.prefetcher.start()
+
+    def stop_prefetcher(self):
+        if self.prefetcher:
+            self.prefetcher.stop()
+            self.prefetcher = None
+
+    def update_watchlist(self):
+        if self.prefetcher:
+            self.prefetcher.set_watchlist([company.split('(')[1].split(')')[0]
+                                           for company in self.selected_companies])
+
     def prompt_for_2fa(self):
         return simpledialog.askstring("2FA Code", "Enter your 6-digit 2FA code:", parent=self.master)
 
     def logout_from_degiro(self):
         if self.degiro_connector:
+            self.stop_prefetcher()
             self.degiro_connector.disconnect()
             self.degiro_connector = None
             self.connection_status.config(text="Not Connected", foreground="red")
@@ -818,14 +1107,31 @@ class GUIController:
             return
 
         query = self.search_entry.get()
-        results = self.degiro_connector.search_companies(query)
         self.search_results.delete(0, tk.END)
+        self.search_generation += 1
+        threading.Thread(target=self._search_companies_thread, args=(query, self.search_generation),
+                         daemon=True).start()
 
-        if results:
-            for company in results:
-                self.search_results.insert(tk.END, f"{company['name']} ({company['isin']})")
-        else:
-            messagebox.showinfo("No Results", "No companies found for the given search query.")
+    def _search_companies_thread(self, query, generation):
+        found = False
+        try:
+            # Pages are rendered as they arrive; a newer search stops this one
+            for page in self.degiro_connector.iter_search_pages(
+                    query, max_results=200, stop_when=lambda page: generation != self.search_generation):
+                found = True
+                self.master.after(0, self._append_search_results, page, generation)
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+
+        if not found and generation == self.search_generation:
+            self.master.after(0, lambda: messagebox.showinfo("No Results",
+                                                             "No companies found for the given search query."))
+
+    def _append_search_results(self, page, generation):
+        if generation != self.search_generation:
+            return
+        for company in page:
+            self.search_results.insert(tk.END, f"{company['name']} ({company['isin']})")
 
     def add_company(self):
         selection = self.search_results.curselection()
@@ -834,6 +1140,7 @@ class GUIController:
             if company not in self.selected_companies:
                 self.selected_companies.append(company)
                 self.selected_companies_list.insert(tk.END, company)
+                self.update_watchlist()
 
     def remove_company(self):
         selection = self.selected_companies_list.curselection()
@@ -841,6 +1148,7 @@ class GUIController:
             index = selection[0]
             self.selected_companies.pop(index)
             self.selected_companies_list.delete(index)
+            self.update_watchlist()
 
     def generate_reports(self):
         if not self.selected_companies:
@@ -857,27 +1165,61 @@ class GUIController:
     def _generate_reports_thread(self):
         try:
             api_handler = APIHandler()
+            bypass_cache = self.bypass_response_cache.get()
+            api_handler.use_response_cache = not bypass_cache
+            APIHandler.metrics().start_run("reports")
+
+            # Get financial data for all selected companies in one concurrent batch
+            isins = [company.split('(')[1].split(')')[0] for company in self.selected_companies]
+            force_refresh = self.force_refresh_data.get()
+            all_data = self.degiro_connector.fetch_data(isins, force_refresh=force_refresh)
+            processed, _ = self.incremental_processor.process_all(all_data)
+            self.sector_index.update_processed(processed)
+            self.sector_index.save()
+
+            use_ai = self.use_perplexity_api.get()
+            # Everything besides the company's own payload that shapes its report
+            rules = Json_Codec.dumps_bytes(InterpretationEngine().rules, sort_keys=True)
+            settings = {'use_perplexity_api': use_ai, 'interpretation_rules': hashlib.sha1(rules).hexdigest()}
+            if use_ai:
+                settings.update(prompt=api_handler.get_individual_prompt(), max_tokens=api_handler.get_max_tokens(),
+                                temperature=api_handler.get_model_temperature())
+
+            companies = {}
+            report_keys = {}
             for company in self.selected_companies:
                 company_name = company.split('(')[0].strip()
                 isin = company.split('(')[1].split(')')[0]
-
-                # Get financial data
-                data = self.degiro_connector.fetch_data([isin])
-                data_processor = DataProcessor(data)
-                data_processor.process_data()
-
-                # Get AI analysis if enabled
-                ai_analysis = None
-                if self.use_perplexity_api.get():
-                    ai_analysis = api_handler.get_individual_analysis(company_name)
-
+                overview = processed[isin].get('company_overview', {})
+                peers = self.sector_index.peer_version(overview.get('sector'), overview.get('industry'))
+                report_keys[isin] = self.incremental_processor.report_key(isin, all_data[isin],
+                                                                          dict(settings, peers=peers))
+
+                # Report already rendered from these inputs and settings: keep it and skip the AI call,
+                # unless a fresh analysis is wanted
+                if (not force_refresh and not (bypass_cache and use_ai) and os.path.exists(f"{company_name}_financial_report.pdf")
+                        and self.incremental_processor.report_is_current(isin, report_keys[isin])):
+                    logger.info(f"{company_name} unchanged since its last report, keeping it")
+                    continue
+                companies[isin] = company_name
+
+            # Get AI analyses if enabled, all companies at once
+            ai_analyses = {}
+            if use_ai:
+                ai_analyses = api_handler.get_individual_analyses(companies, on_text=self.show_streamed_text)
+
+            for isin, company_name in companies.items():
                 # Generate PDF
                 pdf_generator = PDFGenerator(
-                    processed_data=data_processor.processed_data,
-                    ai_insights=ai_analysis,
-                    company_name=company_name
+                    processed_data=processed[isin],
+                    ai_insights=ai_analyses.get(isin),
+                    company_name=company_name,
+                    percentile_index=self.sector_index
                 )
                 pdf_generator.generate_pdf()
+                # A report missing its requested AI analysis is regenerated next time
+                if not use_ai or ai_analyses.get(isin) is not None:
+                    self.incremental_processor.report_rendered(isin, report_keys[isin])
 
         except Exception as e:
             error_message = f"Failed to generate reports: {str(e)}\n{traceback.format_exc()}"
@@ -926,7 +1268,7 @@ def main():
         root.mainloop()
     finally:
         if app.degiro_connector:
-            app.degiro_connector.disconnect()
+            app.degiro_connector.disconnect(keep_session=True)
 
 if __name__ == "__main__":
     main()
@@ -6,8 +6,13 @@ logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-import json
+import hashlib
+import math
 import requests
+from requests.adapters import HTTPAdapter
+from array import array
+import polars as pl
+from collections.abc import Mapping
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, KeepTogether
@@ -15,11 +20,19 @@ from reportlab.lib.units import inch
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import filedialog
 import re
 import webbrowser
 from reportlab.pdfgen import canvas
+from Traffic_Recorder import archive_from_env
+from Disk_Cache import DiskCache
+from LLM_Metrics import LLMMetrics
+import Json_Codec
+from Interpretation_Engine import InterpretationEngine
 
 
 # Set environment variables for TCL and TK
@@ -30,6 +43,158 @@ os.environ['TK_LIBRARY'] = r'C:\Users\daanv\AppData\Local\Programs\Python\Python
 api_key = os.getenv('PERPLEXITY_API_KEY')
 
 
+# Period labels are stored as one-byte codes into this table
+PERIOD_LABELS = ['N/A', 'Annual', 'Trailing 12 Months', 'Most Recent Quarter', 'Last Fiscal Year']
+_PERIOD_CODES = {label: code for code, label in enumerate(PERIOD_LABELS)}
+_SHARED_KEYS = {}
+
+
+def _period_code(period):
+    period = 'N/A' if period is None else period
+    code = _PERIOD_CODES.get(period)
+    if code is None:
+        code = len(PERIOD_LABELS)
+        PERIOD_LABELS.append(sys.intern(str(period)))
+        _PERIOD_CODES[PERIOD_LABELS[code]] = code
+    return code
+
+
+def _shared_keys(keys):
+    """One tuple instance per distinct key list, shared by every section"""
+    keys = tuple(keys)
+    return _SHARED_KEYS.setdefault(keys, keys)
+
+
+def _ordinal(number):
+    """1st, 2nd, 3rd, 4th, ... 11th, 12th, 13th, ... 21st"""
+    number = int(round(number))
+    if 11 <= number % 100 <= 13:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return f"{number}{suffix}"
+
+
+class MetricRecord:
+    """(value, period) pair that unpacks and indexes like the tuple it replaces"""
+    __slots__ = ('value', 'period')
+
+    def __init__(self, value, period):
+        self.value = value
+        self.period = period
+
+    def __iter__(self):
+        return iter((self.value, self.period))
+
+    def __getitem__(self, index):
+        return (self.value, self.period)[index]
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash((self.value, self.period))
+
+    def __repr__(self):
+        return f"MetricRecord({self.value!r}, {self.period!r})"
+
+    def to_json(self):
+        return [self.value, self.period]
+
+
+class MetricSection(Mapping):
+    """Read-only {key: MetricRecord} for one processed_data section.
+
+    Values live in a float array (NaN for None) and periods as one-byte codes.
+    Sections holding unconverted strings keep their values in a list instead.
+    """
+    __slots__ = ('_keys', '_values', '_codes')
+
+    def __init__(self, records):
+        self._keys = _shared_keys(records)
+        values = [value for value, _ in records.values()]
+        self._codes = array('B', (_period_code(period) for _, period in records.values()))
+        if all(value is None or isinstance(value, (int, float)) for value in values):
+            self._values = array('d', (math.nan if value is None else value for value in values))
+        else:
+            self._values = values
+
+    def _value(self, position):
+        value = self._values[position]
+        if isinstance(self._values, array) and math.isnan(value):
+            return None
+        return value
+
+    def __getitem__(self, key):
+        try:
+            position = self._keys.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+        return MetricRecord(self._value(position), PERIOD_LABELS[self._codes[position]])
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __reduce__(self):
+        # Period codes are process-local, so pickle the labels
+        return MetricSection, ({key: tuple(self[key]) for key in self._keys},)
+
+    def __repr__(self):
+        return f"MetricSection({dict(self.items())!r})"
+
+    def to_json(self):
+        return {key: self[key].to_json() for key in self._keys}
+
+
+class MetricPeriods(Mapping):
+    """Read-only {key: {period: value}} of every reporting period per metric, packed
+    into one float array with period codes and per-metric offsets"""
+    __slots__ = ('_keys', '_offsets', '_codes', '_values')
+
+    def __init__(self, metric_periods):
+        self._keys = _shared_keys(metric_periods)
+        self._offsets = array('H', [0])
+        self._codes = array('B')
+        self._values = array('d')
+        for periods in metric_periods.values():
+            for period, value in periods.items():
+                self._codes.append(_period_code(period))
+                self._values.append(value)
+            self._offsets.append(len(self._values))
+
+    def __getitem__(self, key):
+        try:
+            position = self._keys.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return {PERIOD_LABELS[self._codes[i]]: self._values[i] for i in range(start, end)}
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __reduce__(self):
+        return MetricPeriods, ({key: self[key] for key in self._keys},)
+
+    def __repr__(self):
+        return f"MetricPeriods({dict(self.items())!r})"
+
+    def to_json(self):
+        return {key: self[key] for key in self._keys}
+
+
 class DataProcessor:
     METRIC_MAP = {
         'revenue_per_share': ['AREVPS', 'TTMREVPS', 'MRQREVPS', 'LFYREVPS'],
@@ -47,11 +212,38 @@ class DataProcessor:
         'gross_margin': ['AGROSMGN', 'TTMGROSMGN', 'MRQGROSMGN', 'LFYGROSMGN'],
         'free_cash_flow_margin': ['Focf2Rev_TTM', 'AFocf2Rev', 'MRQFocf2Rev', 'LFYFocf2Rev']
     }
+    FINANCIAL_METRICS = ['revenue_per_share', 'eps', 'book_value_per_share',
+                         'cash_per_share', 'free_cash_flow_per_share']
+    VALUATION_RATIOS = ['pe_ratio', 'price_to_sales', 'price_to_book',
+                        'price_to_cash_flow', 'price_to_free_cash_flow']
+    EFFICIENCY_METRICS = ['operating_margin', 'net_profit_margin',
+                          'gross_margin', 'free_cash_flow_margin']
+    # Column order for multi-period tables
+    PERIOD_ORDER = ['Trailing 12 Months', 'Annual', 'Most Recent Quarter', 'Last Fiscal Year']
+    # Raw payload sections each processed section is derived from, in processing order
+    SECTION_INPUTS = {
+        'company_overview': ['profile'],
+        'financial_metrics': ['ratios', 'profile'],
+        'valuation_ratios': ['ratios', 'profile'],
+        'efficiency_metrics': ['ratios', 'profile'],
+        'metric_periods': ['ratios', 'profile']
+    }
+    # Bump when processing rules change so stored sections are recomputed
+    PROCESSING_VERSION = 1
+
+    # Learned extraction plans shared by every DataProcessor, keyed by payload
+    # schema version: ({target ids: (section, path, id)}, sections the version fully describes)
+    _extraction_plans = {}
+    MAX_EXTRACTION_PLANS = 32
 
     def __init__(self, json_data):
         self.raw_data = json_data
         self.processed_data = {}
         self.isin = self._extract_isin()
+        self._metric_index = {}  # section -> {id: (position, value, path)}
+        self._plan = None
+        self._plan_sections = frozenset()
+        self.changed_sections = []
 
     def _extract_isin(self):
         """Safely extract ISIN from raw data structure"""
@@ -65,44 +257,166 @@ class DataProcessor:
             logger.error(f"ISIN extraction error: {str(e)}")
             return 'UNKNOWN'
 
-    def _search_metric(self, target_ids):
-        """Enhanced metric search with path tracking"""
-
-        def search_with_path(data, path=[]):
-            if isinstance(data, dict):
-                # Check for direct match
-                if 'id' in data and data['id'] in target_ids:
-                    return data.get('value'), data['id'], path + [data['id']]
-                # Recursive search
-                for k, v in data.items():
-                    result = search_with_path(v, path + [k])
-                    if result:
-                        return result
-            elif isinstance(data, list):
-                for i, item in enumerate(data):
-                    result = search_with_path(item, path + [f'[{i}]'])
-                    if result:
-                        return result
-            return (None, None, [])
+    @staticmethod
+    def _build_metric_index(data):
+        """Index every metric id in one iterative depth-first pass.
+
+        Maps id -> (position, value, path) for its first occurrence, where
+        position is the pre-order rank, so the earliest match among several
+        candidate ids is the one a recursive depth-first search would hit first.
+        path holds the dict keys and list indices leading to the metric node.
+        """
+        index = {}
+        path = []
+        position = 0
+        stack = [(data, 0, None)]
+        while stack:
+            node, depth, key = stack.pop()
+            del path[depth:]
+            if key is not None:
+                path.append(key)
+
+            if isinstance(node, dict):
+                if 'id' in node:
+                    metric_id = node['id']
+                    try:
+                        if metric_id not in index:
+                            index[metric_id] = (position, node.get('value'), tuple(path))
+                    except TypeError:
+                        pass  # Unhashable ids can never match a METRIC_MAP id
+                    position += 1
+                depth = len(path)
+                stack.extend((node[k], depth, k) for k in reversed(node))
+            elif isinstance(node, list):
+                depth = len(path)
+                stack.extend((node[i], depth, i) for i in range(len(node) - 1, -1, -1))
+        return index
+
+    @staticmethod
+    def _schema_version(data, depth=6):
+        """Layout signature of a payload: dict keys and ids down to depth levels, and the
+        item ids of the lists found there.
+
+        Refinitiv ratios keep their metric items at data.currentRatios.ratiosGroups[].items[],
+        so six levels reach the item lists without visiting the items' contents. Containers
+        the signature does not look into are marked with ..., see _fully_described.
+        """
+        if isinstance(data, dict):
+            if depth == 0:
+                return ...
+            return tuple((k, v if k == 'id' else DataProcessor._schema_version(v, depth - 1)) for k, v in data.items())
+        if isinstance(data, list):
+            if depth == 0:
+                return ...
+            if depth == 1:
+                return tuple(DataProcessor._item_signature(v) for v in data)
+            return tuple(DataProcessor._schema_version(v, depth - 1) for v in data)
+        return None
+
+    @staticmethod
+    def _item_signature(item):
+        """Id of a flat metric item; ... when the item nests containers that could hold more ids"""
+        if isinstance(item, dict):
+            if any(isinstance(v, (dict, list)) for v in item.values()):
+                return ...
+            return item.get('id')
+        return ... if isinstance(item, list) else None
+
+    @staticmethod
+    def _fully_described(signature):
+        """True when a signature reaches every id, so equal signatures mean equal ids at equal paths"""
+        if signature is ...:
+            return False
+        if isinstance(signature, tuple):
+            return all(DataProcessor._fully_described(part) for part in signature)
+        return True
+
+    def _extraction_plan(self):
+        """Plan learned for payloads with the same layout as this one.
+
+        Lookups may only be stored in the plan when every section they read is in
+        _plan_sections, the sections the layout signature fully describes.
+        """
+        if self._plan is None:
+            company_data = self.raw_data.get(self.isin, {})
+            sections = ['ratios', 'profile']
+            version = tuple(self._schema_version(company_data.get(section, {})) for section in sections)
+            plans = DataProcessor._extraction_plans
+            try:
+                if version not in plans:
+                    if len(plans) >= self.MAX_EXTRACTION_PLANS:
+                        plans.clear()
+                    plans[version] = ({}, frozenset(section for section, signature in zip(sections, version)
+                                                    if self._fully_described(signature)))
+                self._plan, self._plan_sections = plans[version]
+            except TypeError:
+                self._plan = {}  # Unhashable ids, nothing to share
+        return self._plan
+
+    def _follow(self, section, path):
+        """Node at path in a section, or None when the payload does not have it"""
+        node = self.raw_data.get(self.isin, {}).get(section, {})
+        try:
+            for key in path:
+                node = node[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+        return node
+
+    def _section_index(self, section):
+        if section not in self._metric_index:
+            section_data = self.raw_data.get(self.isin, {}).get(section, {})
+            self._metric_index[section] = self._build_metric_index(section_data)
+        return self._metric_index[section]
 
+    def _search_index(self, target_ids):
+        """Full search: (value, id, section, path) of the first candidate found, ratios before profile"""
         # Search both profile and ratios sections
         for section in ['ratios', 'profile']:
-            section_data = self.raw_data.get(self.isin, {}).get(section, {})
-            value, found_id, path = search_with_path(section_data)
+            index = self._section_index(section)
+            matches = [(index[target_id], target_id) for target_id in target_ids if target_id in index]
+            if not matches:
+                continue
+            (_, value, path), found_id = min(matches, key=lambda match: match[0][0])
             if value is not None:
-                try:
-                    # Handle numeric values with commas
-                    if isinstance(value, str):
-                        value = value.replace(',', '')
-                    return float(value), found_id
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Value conversion failed for {found_id}: {value} ({str(e)})")
-                    return value, found_id
-
-        logger.warning(f"Metric not found: {target_ids} in {self.isin}")
-        return (None, None)
-
-    def _get_period(self, metric_id):
+                return value, found_id, section, path
+        return None, None, None, None
+
+    def _find_metric(self, target_ids):
+        """Raw (value, id) of a metric, read through the learned plan when it still fits"""
+        plan = self._extraction_plan()
+        key = tuple(target_ids)
+        planned = plan.get(key)
+        if planned is not None:
+            section, path, found_id = planned
+            node = self._follow(section, path)
+            if isinstance(node, dict) and node.get('id') == found_id and node.get('value') is not None:
+                return node['value'], found_id
+            logger.debug(f"Extraction plan miss for {found_id} in {self.isin}")
+
+        value, found_id, section, path = self._search_index(target_ids)
+        # Only ratios answers are planned: a profile answer also depends on ratios values being null
+        if section == 'ratios' and section in self._plan_sections:
+            plan[key] = (section, path, found_id)
+        return value, found_id
+
+    def _search_metric(self, target_ids):
+        """Metric lookup served from the per-section id index"""
+        value, found_id = self._find_metric(target_ids)
+        if found_id is None:
+            logger.warning(f"Metric not found: {target_ids} in {self.isin}")
+            return (None, None)
+        try:
+            # Handle numeric values with commas
+            if isinstance(value, str):
+                value = value.replace(',', '')
+            return float(value), found_id
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Value conversion failed for {found_id}: {value} ({str(e)})")
+            return value, found_id
+
+    @staticmethod
+    def _get_period(metric_id):
         """Improved period detection with fallback"""
         period_map = {
             'A': ('Annual', 1),
@@ -123,21 +437,69 @@ class DataProcessor:
         # Fallback to first character
         return period_map.get(metric_id[0], ('N/A',))[0]
 
-    def process_data(self):
-        """Main processing method with enhanced validation"""
+    def process_data(self, previous=None):
+        """Main processing method with enhanced validation.
+
+        previous is an export_state() from an earlier run; sections whose input
+        hashes still match are restored from it instead of being recomputed.
+        changed_sections lists the sections that were recomputed.
+        """
+        steps = {
+            'company_overview': self.process_company_overview,
+            'financial_metrics': self.calculate_financial_metrics,
+            'valuation_ratios': self.calculate_valuation_ratios,
+            'efficiency_metrics': self.calculate_efficiency_metrics,
+            'metric_periods': self.extract_metric_periods
+        }
         try:
             if not self.raw_data:
                 raise ValueError("Empty raw data provided")
 
-            self.process_company_overview()
-            self.calculate_financial_metrics()
-            self.calculate_valuation_ratios()
-            self.calculate_efficiency_metrics()
+            hashes = self.input_hashes()
+            reusable = {}
+            if previous and previous.get('version') == self.PROCESSING_VERSION:
+                reusable = {section: data for section, data in previous.get('sections', {}).items()
+                            if previous.get('hashes', {}).get(section) == hashes[section]}
+
+            self.changed_sections = []
+            for section, step in steps.items():
+                if section in reusable:
+                    self.processed_data[section] = self._restore_section(section, reusable[section])
+                else:
+                    step()
+                    self.changed_sections.append(section)
             self._validate_output()
         except Exception as e:
             logger.error(f"Data processing failed: {str(e)}")
             raise
 
+    def input_hashes(self):
+        """Content hash of the raw inputs of every processed section"""
+        company_data = self.raw_data.get(self.isin, {})
+        payload_hashes = {
+            name: hashlib.sha1(Json_Codec.dumps_bytes(company_data.get(name, {}), sort_keys=True)).hexdigest()
+            for name in ['profile', 'ratios']
+        }
+        return {section: ':'.join(payload_hashes[name] for name in inputs)
+                for section, inputs in self.SECTION_INPUTS.items()}
+
+    def export_state(self):
+        """Processed sections with their input hashes, for process_data(previous=...)"""
+        return {
+            'version': self.PROCESSING_VERSION,
+            'hashes': self.input_hashes(),
+            'sections': {section: self.processed_data[section] for section in self.SECTION_INPUTS
+                         if section in self.processed_data}
+        }
+
+    @staticmethod
+    def _restore_section(section, data):
+        if section == 'metric_periods':
+            return MetricPeriods(data)
+        if section == 'company_overview':
+            return dict(data)
+        return MetricSection(data)
+
     def _validate_output(self):
         """Ensure required metrics exist"""
         required_sections = ['financial_metrics', 'valuation_ratios', 'efficiency_metrics']
@@ -147,14 +509,18 @@ class DataProcessor:
 
     def process_company_overview(self):
         """Robust company overview processing"""
+        self.processed_data['company_overview'] = self.company_overview(self.isin, self.raw_data.get(self.isin, {}))
+
+    @staticmethod
+    def company_overview(isin, company_data):
+        """Overview fields of one company's raw payload"""
         try:
-            company_data = self.raw_data.get(self.isin, {})
             profile = company_data.get('profile', {}).get('data', {})
             contacts = profile.get('contacts', {})
 
-            self.processed_data['company_overview'] = {
-                'legal_name': contacts.get('NAME', f"Unknown Company ({self.isin})"),
-                'isin': self.isin,
+            return {
+                'legal_name': contacts.get('NAME', f"Unknown Company ({isin})"),
+                'isin': isin,
                 'sector': profile.get('sector', 'N/A'),
                 'industry': profile.get('industry', 'N/A'),
                 'country': contacts.get('COUNTRY', 'N/A'),
@@ -163,9 +529,9 @@ class DataProcessor:
             }
         except Exception as e:
             logger.error(f"Company overview error: {str(e)}")
-            self.processed_data['company_overview'] = {
-                'legal_name': f"Unknown Company ({self.isin})",
-                'isin': self.isin,
+            return {
+                'legal_name': f"Unknown Company ({isin})",
+                'isin': isin,
                 'sector': 'N/A',
                 'industry': 'N/A',
                 'country': 'N/A',
@@ -177,64 +543,144 @@ class DataProcessor:
         """Financial metrics with value validation"""
         logger.info("Calculating financial metrics...")
         metrics = {}
-        for key in ['revenue_per_share', 'eps', 'book_value_per_share',
-                    'cash_per_share', 'free_cash_flow_per_share']:
+        for key in self.FINANCIAL_METRICS:
             value, found_id = self._search_metric(self.METRIC_MAP[key])
             period = self._get_period(found_id)
 
-            # Validate reasonable value ranges
-            if value is not None:
-                if key.endswith('_per_share') and value < 0:
-                    logger.warning(f"Negative value for {key}: {value}")
-                    value = None
-                elif key == 'eps' and abs(value) > 1000:  # Unrealistic EPS values
-                    logger.warning(f"Suspicious EPS value: {value}")
-                    value = None
-
-            metrics[key] = (value, period)
-        self.processed_data['financial_metrics'] = metrics
+            metrics[key] = (self._check_value(key, value), period)
+        self.processed_data['financial_metrics'] = MetricSection(metrics)
 
     def calculate_valuation_ratios(self):
         """Valuation ratios with sanity checks"""
         logger.info("Calculating valuation metrics...")
         ratios = {}
-        for key in ['pe_ratio', 'price_to_sales', 'price_to_book',
-                    'price_to_cash_flow', 'price_to_free_cash_flow']:
+        for key in self.VALUATION_RATIOS:
             value, found_id = self._search_metric(self.METRIC_MAP[key])
             period = self._get_period(found_id)
 
-            # Validate ratio ranges
-            if value is not None:
-                if key == 'pe_ratio' and (value < 0 or value > 1000):
-                    logger.warning(f"Unusual P/E ratio: {value}")
-                elif value < 0:
-                    logger.warning(f"Negative ratio for {key}: {value}")
-                    value = None
-
-            ratios[key] = (value, period)
-        self.processed_data['valuation_ratios'] = ratios
+            ratios[key] = (self._check_value(key, value), period)
+        self.processed_data['valuation_ratios'] = MetricSection(ratios)
 
     def calculate_efficiency_metrics(self):
         """Efficiency metrics with percentage handling"""
         logger.info("Calculating efficiency metrics...")
         metrics = {}
-        for key in ['operating_margin', 'net_profit_margin',
-                    'gross_margin', 'free_cash_flow_margin']:
+        for key in self.EFFICIENCY_METRICS:
             value, found_id = self._search_metric(self.METRIC_MAP[key])
             period = self._get_period(found_id)
 
+            metrics[key] = (self._check_value(key, value), period)
+        self.processed_data['efficiency_metrics'] = MetricSection(metrics)
+
+    def _check_value(self, key, value, warn=True):
+        """Apply the range and percentage rules of the metric's section"""
+        if value is None:
+            return None
+        if key in self.EFFICIENCY_METRICS:
             # Convert percentages to decimals
-            if value is not None and isinstance(value, str) and '%' in value:
+            if isinstance(value, str) and '%' in value:
                 try:
                     value = float(value.strip('%')) / 100
                 except ValueError:
                     value = None
+        elif key in self.FINANCIAL_METRICS:
+            # Validate reasonable value ranges
+            if key.endswith('_per_share') and value < 0:
+                if warn:
+                    logger.warning(f"Negative value for {key}: {value}")
+                value = None
+            elif key == 'eps' and abs(value) > 1000:  # Unrealistic EPS values
+                if warn:
+                    logger.warning(f"Suspicious EPS value: {value}")
+                value = None
+        elif key in self.VALUATION_RATIOS:
+            # Validate ratio ranges
+            if key == 'pe_ratio' and (value < 0 or value > 1000):
+                if warn:
+                    logger.warning(f"Unusual P/E ratio: {value}")
+            elif value < 0:
+                if warn:
+                    logger.warning(f"Negative ratio for {key}: {value}")
+                value = None
+        return value
+
+    def _find_all_metrics(self, target_ids):
+        """Raw (id, value) of every candidate present, ratios before profile, read through
+        the learned plan when it still fits"""
+        plan = self._extraction_plan()
+        key = ('periods',) + tuple(target_ids)
+        planned = plan.get(key)
+        if planned is not None:
+            found = []
+            for section, path, target_id in planned:
+                node = self._follow(section, path)
+                if not (isinstance(node, dict) and node.get('id') == target_id):
+                    logger.debug(f"Extraction plan miss for {target_id} in {self.isin}")
+                    break
+                found.append((target_id, node.get('value')))
+            else:
+                return found
+
+        located = []
+        found = []
+        for section in ['ratios', 'profile']:
+            index = self._section_index(section)
+            for target_id in target_ids:
+                if target_id in index:
+                    _, value, path = index[target_id]
+                    located.append((section, path, target_id))
+                    found.append((target_id, value))
+        if self._plan_sections >= {'ratios', 'profile'}:
+            plan[key] = located
+        return found
+
+    def extract_metric_periods(self):
+        """Every available reporting period of every metric in a single pass.
+
+        Fills processed_data['metric_periods'] with a MetricPeriods mapping of
+        {key: {period: value}}, periods in PERIOD_ORDER. Ratios take precedence over
+        profile, and the first candidate id wins when two ids report the same period.
+        Values that are not numeric are dropped.
+        """
+        metric_periods = {}
+        for key, target_ids in self.METRIC_MAP.items():
+            found = {}
+            for target_id, value in self._find_all_metrics(target_ids):
+                period = self._get_period(target_id)
+                if value is None or period in found:
+                    continue
+                if not (key in self.EFFICIENCY_METRICS and isinstance(value, str) and '%' in value):
+                    try:
+                        value = float(value.replace(',', '') if isinstance(value, str) else value)
+                    except (ValueError, TypeError):
+                        continue
+                value = self._check_value(key, value, warn=False)
+                if value is not None:
+                    found[period] = value
+            metric_periods[key] = {period: found[period]
+                                   for period in sorted(found, key=self._period_rank)}
+        self.processed_data['metric_periods'] = MetricPeriods(metric_periods)
+        return self.processed_data['metric_periods']
 
-            metrics[key] = (value, period)
-        self.processed_data['efficiency_metrics'] = metrics
+    def _period_rank(self, period):
+        return self.PERIOD_ORDER.index(period) if period in self.PERIOD_ORDER else len(self.PERIOD_ORDER)
 
 
 class APIHandler:
+    # Keep-alive sessions shared by every APIHandler, one per pool size
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+    # Completed analyses shared by every APIHandler, keyed on the request that produced them
+    _response_cache = None
+    _response_cache_lock = threading.Lock()
+    RESPONSE_CACHE_NAMESPACE = 'llm_response'
+    # Earliest moment the next request may be sent, shared so every handler honours the rate limit
+    _next_request_at = 0.0
+    _rate_lock = threading.Lock()
+    # Token, latency and cache accounting shared by every APIHandler
+    _metrics = None
+    _metrics_lock = threading.Lock()
+
     def __init__(self):
         self.api_key = os.getenv('PERPLEXITY_API_KEY')
         self.api_url = "https://api.perplexity.ai/chat/completions"
@@ -282,6 +728,17 @@ class APIHandler:
         self._comparison_prompt = self._default_comparison_prompt
         self._max_tokens = 1000
         self._model_temperature = 0.2
+        self._connect_timeout = 10.0
+        self._read_timeout = 120.0
+        self._pool_size = 4
+        self._cache_ttl = 7 * 24 * 3600
+        self._cache_max_entries = 500
+        self._max_concurrent_requests = 8
+        self._requests_per_minute = 50
+        # Cleared to skip cached analyses; fresh responses are still stored
+        self.use_response_cache = True
+        # Optional Traffic_Recorder.TrafficArchive recording or replaying Perplexity calls
+        self.traffic_archive = archive_from_env()
 
         self.load_settings()
 
@@ -290,24 +747,36 @@ class APIHandler:
             'individual_prompt': self._individual_prompt,
             'comparison_prompt': self._comparison_prompt,
             'max_tokens': self._max_tokens,
-            'model_temperature': self._model_temperature
+            'model_temperature': self._model_temperature,
+            'connect_timeout': self._connect_timeout,
+            'read_timeout': self._read_timeout,
+            'pool_size': self._pool_size,
+            'cache_ttl': self._cache_ttl,
+            'cache_max_entries': self._cache_max_entries,
+            'max_concurrent_requests': self._max_concurrent_requests,
+            'requests_per_minute': self._requests_per_minute
         }
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(settings, f, indent=4)
+            Json_Codec.dump(settings, self.config_file, indent=True)
             logger.info("Settings saved successfully")
         except Exception as e:
             logger.error(f"Error saving settings: {e}")
 
     def load_settings(self):
         try:
-            with open(self.config_file, 'r') as f:
-                settings = json.load(f)
-                self._individual_prompt = settings.get('individual_prompt', self._individual_prompt)
-                self._comparison_prompt = settings.get('comparison_prompt', self._comparison_prompt)
-                self._max_tokens = settings.get('max_tokens', self._max_tokens)
-                self._model_temperature = settings.get('model_temperature', self._model_temperature)
-                logger.debug(f"Loaded settings: individual_prompt='{self._individual_prompt}'")
+            settings = Json_Codec.load(self.config_file)
+            self._individual_prompt = settings.get('individual_prompt', self._individual_prompt)
+            self._comparison_prompt = settings.get('comparison_prompt', self._comparison_prompt)
+            self._max_tokens = settings.get('max_tokens', self._max_tokens)
+            self._model_temperature = settings.get('model_temperature', self._model_temperature)
+            self._connect_timeout = settings.get('connect_timeout', self._connect_timeout)
+            self._read_timeout = settings.get('read_timeout', self._read_timeout)
+            self._pool_size = settings.get('pool_size', self._pool_size)
+            self._cache_ttl = settings.get('cache_ttl', self._cache_ttl)
+            self._cache_max_entries = settings.get('cache_max_entries', self._cache_max_entries)
+            self._max_concurrent_requests = settings.get('max_concurrent_requests', self._max_concurrent_requests)
+            self._requests_per_minute = settings.get('requests_per_minute', self._requests_per_minute)
+            logger.debug(f"Loaded settings: individual_prompt='{self._individual_prompt}'")
         except FileNotFoundError:
             self.save_settings()
 
@@ -341,74 +810,240 @@ class APIHandler:
         self._model_temperature = temperature
         self.save_settings()
 
-    def get_individual_analysis(self, company_name):
-        """Gets AI analysis for a single company based on the configured prompt"""
+    @classmethod
+    def _session(cls, pool_size):
+        """Shared session holding at most pool_size keep-alive connections per host"""
+        with cls._sessions_lock:
+            session = cls._sessions.get(pool_size)
+            if session is None:
+                session = requests.Session()
+                # pool_block makes extra concurrent requests wait for a warm connection
+                session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True))
+                cls._sessions[pool_size] = session
+            return session
+
+    @classmethod
+    def _wait_for_rate_limit(cls, requests_per_minute):
+        """Block until a request may be sent without exceeding requests_per_minute"""
+        if not requests_per_minute:
+            return
+        with cls._rate_lock:
+            now = time.monotonic()
+            send_at = max(now, cls._next_request_at)
+            cls._next_request_at = send_at + 60.0 / requests_per_minute
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def _post(self, data, stream=False):
+        """POST a chat completion request, through the traffic archive when one is enabled"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        def send():
+            # Enough warm connections for every concurrent analysis
+            pool_size = max(self._pool_size, self._max_concurrent_requests)
+            return self._session(pool_size).post(self.api_url, headers=headers, data=Json_Codec.dumps_bytes(data), stream=stream,
+                                                 timeout=(self._connect_timeout, self._read_timeout))
+
+        if self.traffic_archive is not None:
+            return self.traffic_archive.record_http('perplexity', {'url': self.api_url, 'json': data}, send)
+        return send()
+
+    @classmethod
+    def response_cache(cls, ttl, max_entries):
+        """Shared DiskCache of completed analyses, expiring after ttl and holding at most max_entries"""
+        with cls._response_cache_lock:
+            if cls._response_cache is None:
+                cls._response_cache = DiskCache('llm_response_cache.sqlite', max_entries=max_entries)
+            cls._response_cache.set_ttl(cls.RESPONSE_CACHE_NAMESPACE, ttl)
+            cls._response_cache.max_entries = max_entries
+            return cls._response_cache
+
+    @staticmethod
+    def _cache_key(data):
+        """Content hash of everything that shapes the answer: model, rendered prompt, max_tokens, temperature"""
+        request = [data['model'], data['messages'], data['max_tokens'], data.get('temperature')]
+        return hashlib.sha256(Json_Codec.dumps_bytes(request, sort_keys=True, default=str)).hexdigest()
+
+    @classmethod
+    def metrics(cls):
+        """Shared LLMMetrics recording every call"""
+        with cls._metrics_lock:
+            if cls._metrics is None:
+                cls._metrics = LLMMetrics('llm_metrics.sqlite')
+            return cls._metrics
+
+    def _complete(self, data, kind='individual'):
+        """Response JSON for a chat completion request, served from the response cache when possible"""
+        cache = self.response_cache(self._cache_ttl, self._cache_max_entries)
+        key = self._cache_key(data)
+        if self.use_response_cache:
+            start = time.perf_counter()
+            cached = cache.get(self.RESPONSE_CACHE_NAMESPACE, key)
+            if cached is not None:
+                logger.info(f"AI analysis served from the response cache ({key[:12]})")
+                self.metrics().record(kind, data['model'], time.perf_counter() - start, cache_hit=True)
+                return cached
+
+        self._wait_for_rate_limit(self._requests_per_minute)
+        start = time.perf_counter()
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            response = self._post(data)
+            response.raise_for_status()
+            response_json = response.json()
+        except Exception as e:
+            self.metrics().record(kind, data['model'], time.perf_counter() - start, error=str(e))
+            raise
+        usage = response_json.get('usage') or {}
+        self.metrics().record(kind, data['model'], time.perf_counter() - start,
+                              usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        # Token usage belongs to the original call, so only the answer is kept
+        cache.set(self.RESPONSE_CACHE_NAMESPACE, key, {'choices': response_json['choices']})
+        return response_json
+
+    def _individual_request(self, company_name):
+        return {
+            "model": "llama-3.1-sonar-small-128k-online",
+            # "model": "llama a-3.1-70b-instruct",
+
+            "messages": [{
+                "role": "user",
+                "content": self._individual_prompt.format(company_name=company_name)
+            }],
+            "max_tokens": self._max_tokens,
+            "temperature": self._model_temperature,
 
-            data = {
-                "model": "llama-3.1-sonar-small-128k-online",
-                # "model": "llama a-3.1-70b-instruct",
+        }
 
-                "messages": [{
-                    "role": "user",
-                    "content": self._individual_prompt.format(company_name=company_name)
-                }],
-                "max_tokens": self._max_tokens,
-                "temperature": self._model_temperature,
+    def _stream(self, data, kind='individual'):
+        """Yield completion text as it arrives as server-sent events; the full answer goes to the response cache"""
+        if self.traffic_archive is not None:
+            # Archived exchanges hold whole responses, so record and replay without streaming
+            yield self._complete(data, kind)['choices'][0]['message']['content']
+            return
 
-            }
+        cache = self.response_cache(self._cache_ttl, self._cache_max_entries)
+        key = self._cache_key(data)
+        if self.use_response_cache:
+            start = time.perf_counter()
+            cached = cache.get(self.RESPONSE_CACHE_NAMESPACE, key)
+            if cached is not None:
+                logger.info(f"AI analysis served from the response cache ({key[:12]})")
+                self.metrics().record(kind, data['model'], time.perf_counter() - start, cache_hit=True)
+                yield cached['choices'][0]['message']['content']
+                return
+
+        self._wait_for_rate_limit(self._requests_per_minute)
+        start = time.perf_counter()
+        chunks = []
+        usage = {}
+        try:
+            with self._post({**data, "stream": True}, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    line = line.decode('utf-8')
+                    if not line.startswith('data:'):
+                        continue
+                    payload = line[len('data:'):].strip()
+                    if payload == '[DONE]':
+                        break
+                    event = Json_Codec.loads(payload)
+                    # Usage is reported on the events, complete on the last one
+                    usage = event.get('usage') or usage
+                    choices = event.get('choices') or [{}]
+                    text = (choices[0].get('delta') or {}).get('content')
+                    if text:
+                        if not chunks:
+                            logger.info(f"First analysis text after {time.perf_counter() - start:.1f}s")
+                        chunks.append(text)
+                        yield text
+        except Exception as e:
+            self.metrics().record(kind, data['model'], time.perf_counter() - start, error=str(e))
+            raise
 
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
+        content = ''.join(chunks)
+        logger.info(f"Streamed {len(content)} characters in {time.perf_counter() - start:.1f}s")
+        self.metrics().record(kind, data['model'], time.perf_counter() - start,
+                              usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        cache.set(self.RESPONSE_CACHE_NAMESPACE, key,
+                  {'choices': [{'message': {'role': 'assistant', 'content': content}}]})
+
+    def stream_individual_analysis(self, company_name):
+        """Yields the individual analysis in pieces as the model produces them"""
+        yield from self._stream(self._individual_request(company_name))
+
+    def get_individual_analysis(self, company_name, on_text=None):
+        """Gets AI analysis for a single company based on the configured prompt.
+
+        With on_text the response is streamed and on_text(company_name, text) is
+        called for every piece as it arrives.
+        """
+        try:
+            if on_text is not None:
+                chunks = []
+                for text in self.stream_individual_analysis(company_name):
+                    chunks.append(text)
+                    on_text(company_name, text)
+                return ''.join(chunks).strip()
+
+            response_json = self._complete(self._individual_request(company_name))
 
-            # Print token usage information
+            # Log token usage; every call is also recorded in metrics()
             if 'usage' in response_json:
                 usage = response_json['usage']
-                print(f"\nToken Usage:")
-                print(f"Prompt tokens: {usage.get('prompt_tokens', 'N/A')}")
-                print(f"Completion tokens: {usage.get('completion_tokens', 'N/A')}")
-                print(f"Total tokens: {usage.get('total_tokens', 'N/A')}\n")
+                logger.info(f"Token usage for {company_name}: {usage.get('prompt_tokens', 'N/A')} prompt, "
+                            f"{usage.get('completion_tokens', 'N/A')} completion, "
+                            f"{usage.get('total_tokens', 'N/A')} total")
 
             return response_json['choices'][0]['message']['content'].strip()
         except Exception as e:
             logger.error(f"Error in individual analysis: {e}")
             return None
 
+    def get_individual_analyses(self, companies, max_workers=None, on_text=None):
+        """Individual analyses for {isin: company_name}, requested concurrently; returns {isin: analysis or None}"""
+        max_workers = max_workers or self._max_concurrent_requests
+        if max_workers <= 1 or len(companies) <= 1:
+            return {isin: self.get_individual_analysis(company_name, on_text)
+                    for isin, company_name in companies.items()}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="perplexity") as executor:
+            futures = {isin: executor.submit(self.get_individual_analysis, company_name, on_text)
+                       for isin, company_name in companies.items()}
+            analyses = {isin: future.result() for isin, future in futures.items()}
+        logger.info(f"Requested {len(analyses)} analyses with {max_workers} workers "
+                    f"in {time.perf_counter() - start:.1f}s")
+        return analyses
+
     def get_comparison_analysis(self, companies_data):
         """Gets AI analysis comparing multiple companies based on the configured prompt"""
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-
             data = {
                 "model": "llama-3.1-sonar-small-128k-online",
                 "messages": [{
                     "role": "user",
-                    "content": f"{self._comparison_prompt}\n{json.dumps(companies_data, indent=2)}"
+                    "content": f"{self._comparison_prompt}\n{Json_Codec.dumps(companies_data)}"
                 }],
                 "max_tokens": self._max_tokens
             }
 
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content'].strip()
+            return self._complete(data, 'comparison')['choices'][0]['message']['content'].strip()
         except Exception as e:
             logger.error(f"Error in comparison analysis: {e}")
             return None
 
 
 class PDFGenerator:
-    def __init__(self, processed_data, ai_insights, company_name):
+    def __init__(self, processed_data, ai_insights, company_name, percentile_index=None):
         self.processed_data = processed_data
         self.ai_insights = ai_insights
         self.company_name = company_name
+        # Optional Sector_Index.SectorPercentileIndex for peer-relative interpretations
+        self.percentile_index = percentile_index
+        self.interpretation_engine = InterpretationEngine()
         self.doc = SimpleDocTemplate(f"{company_name}_financial_report.pdf", pagesize=letter)
         self.styles = getSampleStyleSheet()
         self.story = []
@@ -461,8 +1096,7 @@ class PDFGenerator:
                 metrics_data.append(row)
 
             # Create and style the table
-            table = Table(metrics_data, colWidths=[2 * inch] + [1.5 * inch] * len(companies))
-            table.setStyle(TableStyle([
+            table_style = TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -472,11 +1106,53 @@ class PDFGenerator:
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
                 ('FONTSIZE', (0, 1), (-1, -1), 10)
-            ]))
+            ])
+            table = Table(metrics_data, colWidths=[2 * inch] + [1.5 * inch] * len(companies))
+            table.setStyle(table_style)
 
             self.story.append(table)
             self.story.append(Spacer(1, 12))
 
+            # Interpretations for every company and metric in one vectorized pass
+            values = {}
+            for metric_name, (section, key) in metrics_to_compare.items():
+                column = []
+                for company in self.processed_data:
+                    try:
+                        value = company['financial_data'][section][key][0]
+                        column.append(float(value) if value is not None else None)
+                    except (KeyError, IndexError, TypeError, ValueError):
+                        column.append(None)
+                values[key] = column
+            labels = self.interpretation_engine.interpret_frame(
+                pl.DataFrame(values, schema={key: pl.Float64 for key in values}))
+            self.story.append(Paragraph("Interpretation", self.styles['Heading2']))
+            interpretation_data = [headers]
+            for metric_name, (section, key) in metrics_to_compare.items():
+                interpretation_data.append([metric_name] + [
+                    Paragraph(label or 'N/A', self.styles['Normal']) for label in labels[f'{key}_interpretation']
+                ])
+            interpretation_table = Table(interpretation_data, colWidths=[2 * inch] + [1.5 * inch] * len(companies))
+            interpretation_table.setStyle(table_style)
+            self.story.append(interpretation_table)
+            self.story.append(Spacer(1, 12))
+
+            # Trailing 12 months next to the annual figures, when multi-period data is available
+            if any(company.get('financial_data', {}).get('metric_periods') for company in self.processed_data):
+                self.story.append(Paragraph("TTM vs Annual", self.styles['Heading2']))
+                period_data = [['Metric (TTM / Annual)'] + companies]
+                for metric_name, (section, key) in metrics_to_compare.items():
+                    row = [metric_name]
+                    for company in self.processed_data:
+                        periods = company.get('financial_data', {}).get('metric_periods', {}).get(key, {})
+                        row.append(' / '.join(f"{periods[period]:.2f}" if period in periods else 'N/A'
+                                              for period in ['Trailing 12 Months', 'Annual']))
+                    period_data.append(row)
+                period_table = Table(period_data, colWidths=[2 * inch] + [1.5 * inch] * len(companies))
+                period_table.setStyle(table_style)
+                self.story.append(period_table)
+                self.story.append(Spacer(1, 12))
+
             # AI Analysis Section with proper formatting
             if self.ai_insights:
                 sections = self.ai_insights.split('###')
@@ -518,6 +1194,7 @@ class PDFGenerator:
         self.generate_financial_snapshot()
         self.generate_valuation_analysis()
         self.generate_efficiency_and_profitability()
+        self.generate_period_comparison()
 
         # Single unified AI section that handles any response format
         if self.ai_insights:
@@ -565,6 +1242,7 @@ class PDFGenerator:
             table_content.append(Paragraph(title, self.section_style))
             table_data = [columns]
 
+            rows = {}
             for key, (value, period) in data.items():
                 if value is None or value == '—':
                     formatted_value = "N/A"
@@ -573,9 +1251,13 @@ class PDFGenerator:
                     formatted_value = f"{float(value):.2f}" if isinstance(value, (float, int)) else str(value).replace(
                         ',', '.')
                     period_label = f"({period})" if period else ""
+                rows[key] = (formatted_value, period_label)
 
-                interpretation = self.interpret_metric(key, formatted_value)
-                table_data.append([f"{key.replace('_', ' ').title()} {period_label}", formatted_value, interpretation])
+            # Interpret the whole table at once
+            interpretations = self.interpret_metrics({key: formatted for key, (formatted, _) in rows.items()})
+            for key, (formatted_value, period_label) in rows.items():
+                table_data.append([f"{key.replace('_', ' ').title()} {period_label}", formatted_value,
+                                   interpretations[key]])
 
             table = Table(table_data, colWidths=[2.5 * inch, 1.5 * inch, 2 * inch])
             table.setStyle(TableStyle([
@@ -668,6 +1350,48 @@ class PDFGenerator:
         except KeyError as e:
             logger.error(f"Error generating efficiency and profitability: Missing key {e}")
 
+    def generate_period_comparison(self):
+        """Every metric side by side across its reporting periods"""
+        try:
+            metric_periods = self.processed_data.get('metric_periods')
+            if not metric_periods:
+                return
+            available = {period for values in metric_periods.values() for period in values}
+            periods = [period for period in DataProcessor.PERIOD_ORDER if period in available]
+            periods += sorted(available.difference(periods))
+            if len(periods) < 2:
+                return  # Nothing to compare
+
+            table_data = [['Metric'] + periods]
+            for key, values in metric_periods.items():
+                if values:
+                    table_data.append([key.replace('_', ' ').title()] +
+                                      [f"{values[period]:.2f}" if period in values else 'N/A' for period in periods])
+
+            table = Table(table_data, colWidths=[2.5 * inch] + [4 * inch / len(periods)] * len(periods))
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 9),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 9),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
+
+            self.story.append(Paragraph("Reporting Periods", self.styles['Heading1']))
+            self.story.append(table)
+            self.story.append(Spacer(1, 12))
+            self.story.append(Paragraph(
+                "This table puts the trailing twelve months next to the annual and most recent figures, "
+                "so recent momentum can be compared with the last full year.", self.styles['Normal']))
+            self.story.append(Spacer(1, 12))
+        except Exception as e:
+            logger.error(f"Error generating period comparison: {e}")
+
     def get_table_explanation(self, title, data):
         if title == "Key Financial Metrics":
             return (
@@ -682,209 +1406,41 @@ class PDFGenerator:
             return "This table provides important financial information about the company."
 
     # Interpretation methods...
-    def interpret_metric(self, key, value):
-        try:
-            # Check if value is already a float
-            if isinstance(value, float):
-                float_value = value
-            else:
-                # If it's a string, replace comma with period and convert to float
-                float_value = value# = float(str(value).replace(',', '.'))
-
-            if key == 'revenue_per_share':
-                return self.interpret_revenue_per_share(float_value)
-            elif key == 'eps':
-                return self.interpret_eps(float_value)
-            elif key == 'book_value_per_share':
-                return self.interpret_book_value(float_value)
-            elif key == 'pe_ratio':
-                return self.interpret_pe_ratio(float_value)
-            elif key == 'price_to_sales':
-                return self.interpret_price_to_sales(float_value)
-            elif key == 'price_to_book':
-                return self.interpret_price_to_book(float_value)
-            elif key == 'operating_margin':
-                return self.interpret_operating_margin(float_value)
-            elif key == 'net_profit_margin':
-                return self.interpret_net_profit_margin(float_value)
-            elif key == 'cash_per_share':
-                return self.interpret_cash_per_share(value)
-            elif key == 'free_cash_flow_per_share':
-                return self.interpret_free_cash_flow_per_share(value)
-            elif key == 'price_to_cash_flow':
-                return self.interpret_price_to_cash_flow(value)
-            elif key == 'price_to_free_cash_flow':
-                return self.interpret_price_to_cash_flow(value)  # Using same interpretation as price_to_cash_flow
-            elif key == 'gross_margin':
-                return self.interpret_gross_margin(value)
-            elif key == 'free_cash_flow_margin':
-                return self.interpret_free_cash_flow_margin(value)
-            else:
-                return "No interpretation available"
-        except ValueError:
-            return f"Unable to interpret: '{value}' (type: {type(value).__name__}) is not a valid number"
-
-    def interpret_pe_ratio(self, value):
-        try:
-            value = float(value)
-            if value < 15:
-                return "Good: Stock might be cheap"
-            elif value < 25:
-                return "Neutral: Stock price seems fair"
-            else:
-                return "Caution: Stock might be expensive"
-        except ValueError:
-            return "Unable to interpret"
+    def interpret_metrics(self, values):
+        """Labels for {key: value} in one pass: peer percentiles where available, else the threshold table"""
+        labels = self.interpretation_engine.interpret(values)
+        for key, value in values.items():
+            relative = self.interpret_relative(key, value)
+            if relative:
+                labels[key] = relative
+        return labels
 
-    def interpret_price_to_sales(self, value):
-        try:
-            value = float(value)
-            if value < 1:
-                return "Good: Stock might be undervalued"
-            elif value < 2:
-                return "Neutral: Stock price seems reasonable"
-            else:
-                return "Caution: Stock might be overvalued"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_operating_margin(self, value):
-        try:
-            value = float(value)
-            if value < 0:
-                return "Bad: Company is losing money on operations"
-            elif value < 10:
-                return "Caution: Low profit from operations"
-            elif value < 20:
-                return "Good: Decent profit from operations"
-            else:
-                return "Excellent: High profit from operations"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_price_to_book(self, value):
-        try:
-            value = float(value)
-            if value < 1:
-                return "Potentially undervalued"
-            elif value < 3:
-                return "Fairly valued"
-            else:
-                return "Potentially overvalued"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_net_profit_margin(self, value):
-        try:
-            value = float(value)
-            if value < 0:
-                return "Company is not profitable"
-            elif value < 5:
-                return "Low profitability"
-            elif value < 10:
-                return "Moderate profitability"
-            else:
-                return "High profitability"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_revenue_per_share(self, value):
-        if value == "N/A":
-            return "Data not available"
-        try:
-            value = float(value)
-            if value > 10:
-                return "High revenue relative to share price"
-            elif value > 5:
-                return "Moderate revenue relative to share price"
-            else:
-                return "Low revenue relative to share price"
-        except ValueError:
-            return f"Unable to interpret: '{value}' (type: {type(value).__name__}) is not a valid number"
-
-    def interpret_eps(self, value):
-        try:
-            value = float(value)
-            if value > 0:
-                return "Company is profitable"
-            elif value == 0:
-                return "Company is breaking even"
-            else:
-                return "Company is operating at a loss"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_book_value(self, value):
-        try:
-            value = float(value)
-            if value > 0:
-                return "Positive net asset value"
-            else:
-                return "Negative net asset value"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_cash_per_share(self, value):
-        try:
-            value = float(value)
-            if value > 5:
-                return "Strong cash position"
-            elif value > 1:
-                return "Adequate cash reserves"
-            else:
-                return "Low cash reserves"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_free_cash_flow_per_share(self, value):
-        try:
-            value = float(value)
-            if value > 1:
-                return "Strong cash generation"
-            elif value > 0:
-                return "Positive cash generation"
-            else:
-                return "Negative cash generation"
-        except ValueError:
-            return "Unable to interpret"
-
-    def interpret_price_to_cash_flow(self, value):
-        try:
-            value = float(value)
-            if value < 10:
-                return "Potentially undervalued"
-            elif value < 20:
-                return "Fairly valued"
-            else:
-                return "Potentially overvalued"
-        except ValueError:
-            return "Unable to interpret"
+    def interpret_metric(self, key, value):
+        return self.interpret_metrics({key: value})[key]
 
-    def interpret_gross_margin(self, value):
+    def interpret_relative(self, key, value):
+        """Percentile within the company's industry or sector, or None without enough peers"""
+        if self.percentile_index is None or not isinstance(self.processed_data, dict):
+            return None
         try:
             value = float(value)
-            if value > 40:
-                return "High gross profitability"
-            elif value > 20:
-                return "Average gross profitability"
-            else:
-                return "Low gross profitability"
-        except ValueError:
-            return "Unable to interpret"
+        except (TypeError, ValueError):
+            return None
+        overview = self.processed_data.get('company_overview', {})
+        result = self.percentile_index.percentile(key, value, overview.get('sector'), overview.get('industry'))
+        if result is None:
+            return None
 
-    def interpret_free_cash_flow_margin(self, value):
-        try:
-            value = float(value)
-            if value > 10:
-                return "Strong cash flow generation"
-            elif value > 5:
-                return "Good cash flow generation"
-            elif value > 0:
-                return "Positive cash flow generation"
-            else:
-                return "Negative cash flow generation"
-        except ValueError:
-            return "Unable to interpret"
+        percentile, group, peers = result
+        # Cheaper is better for valuation ratios, higher is better for everything else
+        favourable = 100 - percentile if key in DataProcessor.VALUATION_RATIOS else percentile
+        if favourable >= 75:
+            label = "Good"
+        elif favourable > 25:
+            label = "Neutral"
+        else:
+            label = "Caution"
+        return f"{label}: {_ordinal(percentile)} percentile of {peers} {group} peers"
 
     def generate_ai_insights(self):
         try:
@@ -965,8 +1521,11 @@ def main():
             logger.info("No file chosen")
             return
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            json_data = json.load(file)
+        try:
+            json_data = Json_Codec.load(file_path)
+        except ValueError as e:
+            logger.error(f"Invalid JSON file: {e}")
+            return
 
         data_processor = DataProcessor(json_data)
         data_processor.process_data()
@@ -985,8 +1544,6 @@ def main():
         pdf_generator.generate_pdf()
         webbrowser.open(f"{company_name}_financial_report.pdf")
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON file: {e}")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
 
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+import Json_Codec
+from Disk_Cache import DiskCache
+from Generator import DataProcessor
+from Parallel_Processor import ParallelDataProcessor
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class IncrementalProcessor:
+    """Runs DataProcessor against the sections stored from the previous run.
+
+    For every ISIN the processed sections are kept in a DiskCache namespace,
+    next to the content hashes of the raw profile and ratios they came from.
+    Sections whose inputs are unchanged are restored instead of recomputed,
+    and callers learn which companies actually changed.
+
+    Inputs of at least min_parallel companies are processed on a
+    ParallelDataProcessor pool, for the companies whose inputs changed.
+
+    Separately, the key each report was rendered from is kept per ISIN, so a
+    report is only reused when it was built from the same inputs and settings.
+    """
+
+    NAMESPACE = 'processed'
+    REPORT_NAMESPACE = 'reports'
+
+    def __init__(self, cache: DiskCache = None, ttl: float = 30 * 24 * 3600, max_workers: int = None,
+                 min_parallel: int = 200):
+        self.cache = cache if cache is not None else DiskCache('processed_cache.sqlite')
+        self.cache.set_ttl(self.NAMESPACE, ttl)
+        self.cache.set_ttl(self.REPORT_NAMESPACE, ttl)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self._parallel = None
+
+    def process(self, isin: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """Processed data for one company and the sections that had to be recomputed"""
+        data_processor = DataProcessor({isin: payload})
+        data_processor.process_data(previous=self.cache.get(self.NAMESPACE, isin))
+        if data_processor.changed_sections:
+            self.cache.set(self.NAMESPACE, isin, data_processor.export_state())
+        return data_processor.processed_data, data_processor.changed_sections
+
+    def process_all(self, all_data: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Process a fetch_data result; returns ({isin: processed_data}, changed ISINs)"""
+        if self.max_workers > 1 and len(all_data) >= self.min_parallel:
+            return self._process_all_parallel(all_data)
+        processed = {}
+        changed = []
+        for isin, payload in all_data.items():
+            processed[isin], changed_sections = self.process(isin, payload)
+            if changed_sections:
+                changed.append(isin)
+        logger.info(f"Processed {len(processed)} companies, {len(changed)} changed since the last run")
+        return processed, changed
+
+    def _process_all_parallel(self, all_data: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """process_all for large inputs: unchanged companies are restored here, the rest go to the pool.
+
+        Companies that fail to process on the pool are logged and left out.
+        """
+        restored = {}
+        stale = {}
+        hashes = {}
+        for isin, payload in all_data.items():
+            hashes[isin] = DataProcessor({isin: payload}).input_hashes()
+            previous = self.cache.get(self.NAMESPACE, isin)
+            if (previous and previous.get('version') == DataProcessor.PROCESSING_VERSION
+                    and previous.get('hashes') == hashes[isin]
+                    and set(previous.get('sections', {})) == set(DataProcessor.SECTION_INPUTS)):
+                restored[isin] = {section: DataProcessor._restore_section(section, data)
+                                  for section, data in previous['sections'].items()}
+            else:
+                stale[isin] = payload
+
+        if self._parallel is None:
+            self._parallel = ParallelDataProcessor(max_workers=self.max_workers, min_parallel=self.min_parallel)
+        results = self._parallel.process(stale) if stale else {}
+        changed = []
+        for isin, processed_data in results.items():
+            self.cache.set(self.NAMESPACE, isin, {
+                'version': DataProcessor.PROCESSING_VERSION,
+                'hashes': hashes[isin],
+                'sections': {section: processed_data[section] for section in DataProcessor.SECTION_INPUTS
+                             if section in processed_data}
+            })
+            changed.append(isin)
+
+        processed = {isin: restored.get(isin, results.get(isin)) for isin in all_data
+                     if isin in restored or isin in results}
+        logger.info(f"Processed {len(processed)} companies, {len(changed)} changed since the last run, "
+                    f"on {self.max_workers} workers")
+        return processed, changed
+
+    def shutdown(self):
+        if self._parallel is not None:
+            self._parallel.shutdown()
+            self._parallel = None
+
+    @staticmethod
+    def report_key(isin: str, payload: Dict[str, Any], settings: Dict[str, Any]) -> str:
+        """Hash of the raw inputs, processing version and report settings a report is rendered from"""
+        key = {
+            'version': DataProcessor.PROCESSING_VERSION,
+            'inputs': DataProcessor({isin: payload}).input_hashes(),
+            'settings': settings
+        }
+        return hashlib.sha1(Json_Codec.dumps_bytes(key, sort_keys=True)).hexdigest()
+
+    def report_is_current(self, isin: str, report_key: str) -> bool:
+        """True when the last report rendered for isin came from report_key"""
+        return self.cache.get(self.REPORT_NAMESPACE, isin) == report_key
+
+    def report_rendered(self, isin: str, report_key: str):
+        """Record report_key once the report for isin has been written"""
+        self.cache.set(self.REPORT_NAMESPACE, isin, report_key)
+
+    def forget(self, isin: str = None):
+        """Drop stored sections and report keys for one ISIN, or for all of them"""
+        for namespace in [self.NAMESPACE, self.REPORT_NAMESPACE]:
+            if isin is None:
+                self.cache.clear(namespace)
+            else:
+                self.cache.delete(namespace, isin)
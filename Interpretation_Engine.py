@@ -0,0 +1,160 @@
+import logging
+import operator
+from typing import Any, Dict, List
+
+import polars as pl
+
+import Json_Codec
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Per metric: ordered [operator, threshold, label] rules, first match wins, else 'otherwise'.
+# 'not_available' is used for "N/A" values and 'invalid' for other non-numeric ones.
+DEFAULT_RULES = {
+    'pe_ratio': {'rules': [['<', 15, "Good: Stock might be cheap"],
+                           ['<', 25, "Neutral: Stock price seems fair"]],
+                 'otherwise': "Caution: Stock might be expensive"},
+    'price_to_sales': {'rules': [['<', 1, "Good: Stock might be undervalued"],
+                                 ['<', 2, "Neutral: Stock price seems reasonable"]],
+                       'otherwise': "Caution: Stock might be overvalued"},
+    'price_to_book': {'rules': [['<', 1, "Potentially undervalued"],
+                                ['<', 3, "Fairly valued"]],
+                      'otherwise': "Potentially overvalued"},
+    'price_to_cash_flow': {'rules': [['<', 10, "Potentially undervalued"],
+                                     ['<', 20, "Fairly valued"]],
+                           'otherwise': "Potentially overvalued"},
+    'price_to_free_cash_flow': {'rules': [['<', 10, "Potentially undervalued"],
+                                          ['<', 20, "Fairly valued"]],
+                                'otherwise': "Potentially overvalued"},
+    'operating_margin': {'rules': [['<', 0, "Bad: Company is losing money on operations"],
+                                   ['<', 10, "Caution: Low profit from operations"],
+                                   ['<', 20, "Good: Decent profit from operations"]],
+                         'otherwise': "Excellent: High profit from operations"},
+    'net_profit_margin': {'rules': [['<', 0, "Company is not profitable"],
+                                    ['<', 5, "Low profitability"],
+                                    ['<', 10, "Moderate profitability"]],
+                          'otherwise': "High profitability"},
+    'gross_margin': {'rules': [['>', 40, "High gross profitability"],
+                               ['>', 20, "Average gross profitability"]],
+                     'otherwise': "Low gross profitability"},
+    'free_cash_flow_margin': {'rules': [['>', 10, "Strong cash flow generation"],
+                                        ['>', 5, "Good cash flow generation"],
+                                        ['>', 0, "Positive cash flow generation"]],
+                              'otherwise': "Negative cash flow generation"},
+    'revenue_per_share': {'rules': [['>', 10, "High revenue relative to share price"],
+                                    ['>', 5, "Moderate revenue relative to share price"]],
+                          'otherwise': "Low revenue relative to share price",
+                          'not_available': "Data not available",
+                          'invalid': "Unable to interpret: '{value}' (type: {type}) is not a valid number"},
+    'eps': {'rules': [['>', 0, "Company is profitable"],
+                      ['==', 0, "Company is breaking even"]],
+            'otherwise': "Company is operating at a loss"},
+    'book_value_per_share': {'rules': [['>', 0, "Positive net asset value"]],
+                             'otherwise': "Negative net asset value"},
+    'cash_per_share': {'rules': [['>', 5, "Strong cash position"],
+                                 ['>', 1, "Adequate cash reserves"]],
+                       'otherwise': "Low cash reserves"},
+    'free_cash_flow_per_share': {'rules': [['>', 1, "Strong cash generation"],
+                                           ['>', 0, "Positive cash generation"]],
+                                 'otherwise': "Negative cash generation"}
+}
+
+
+class InterpretationEngine:
+    """Applies the threshold table to whole metric columns with polars expressions.
+
+    Rules come from DEFAULT_RULES, overridden per metric by config_file, which
+    is written with the defaults when missing so thresholds can be edited
+    without code changes.
+    """
+
+    OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq}
+    UNAVAILABLE = "Unable to interpret"
+    UNKNOWN = "No interpretation available"
+
+    def __init__(self, config_file: str = 'interpretation_rules.json'):
+        self.config_file = config_file
+        self.rules = {key: dict(rule) for key, rule in DEFAULT_RULES.items()}
+        self.load_rules()
+
+    def load_rules(self):
+        try:
+            overrides = Json_Codec.load(self.config_file)
+        except FileNotFoundError:
+            self.save_rules()
+            return
+        except Exception as e:
+            logger.error(f"Error loading interpretation rules: {e}")
+            return
+        for key, rule in overrides.items():
+            if self._valid(key, rule):
+                self.rules[key] = rule
+
+    def save_rules(self):
+        try:
+            Json_Codec.dump(self.rules, self.config_file, indent=True)
+        except Exception as e:
+            logger.error(f"Error saving interpretation rules: {e}")
+
+    def _valid(self, key: str, rule: Dict[str, Any]) -> bool:
+        try:
+            for op, threshold, label in rule['rules']:
+                if op not in self.OPERATORS or not isinstance(threshold, (int, float)) or not isinstance(label, str):
+                    raise ValueError(f"bad rule {[op, threshold, label]}")
+            if not isinstance(rule['otherwise'], str):
+                raise ValueError("'otherwise' must be a label")
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Ignoring interpretation rule for {key}: {e}")
+            return False
+        return True
+
+    def expression(self, key: str, column: pl.Expr) -> pl.Expr:
+        """Label expression for a Float64 column; null where the value is missing"""
+        rule = self.rules.get(key)
+        if rule is None:
+            return pl.lit(self.UNKNOWN)
+        labels = pl.lit(rule['otherwise'])
+        for op, threshold, label in reversed(rule['rules']):
+            labels = pl.when(self.OPERATORS[op](column, threshold)).then(pl.lit(label)).otherwise(labels)
+        return pl.when(column.is_null()).then(pl.lit(None, dtype=pl.Utf8)).otherwise(labels)
+
+    def interpret_frame(self, frame: pl.DataFrame, keys: List[str] = None) -> pl.DataFrame:
+        """Add '<key>_interpretation' for every numeric metric column, e.g. a BatchDataProcessor frame"""
+        keys = [key for key in (keys or self.rules) if key in frame.columns]
+        return frame.with_columns([
+            self.expression(key, pl.col(key).cast(pl.Float64, strict=False)).alias(f'{key}_interpretation')
+            for key in keys
+        ])
+
+    def interpret(self, values: Dict[str, Any]) -> Dict[str, str]:
+        """Labels for one company's {key: value}; values may be numbers or strings.
+
+        A single company is labelled in plain Python, interpret_frame is for many.
+        """
+        return {key: self.label(key, value) for key, value in values.items()}
+
+    def label(self, key: str, value: Any) -> str:
+        rule = self.rules.get(key)
+        if rule is None:
+            return self.UNKNOWN
+        try:
+            number = float(str(value).strip()) if value is not None else None
+        except ValueError:
+            number = None
+        if number is None:
+            return self._fallback(key, value)
+        for op, threshold, label in rule['rules']:
+            if self.OPERATORS[op](number, threshold):
+                return label
+        return rule['otherwise']
+
+    def _fallback(self, key: str, value: Any) -> str:
+        """Label for values that are missing or not numbers"""
+        rule = self.rules.get(key, {})
+        if value == "N/A" and 'not_available' in rule:
+            return rule['not_available']
+        if 'invalid' in rule:
+            return rule['invalid'].format(value=value, type=type(value).__name__)
+        return self.UNAVAILABLE
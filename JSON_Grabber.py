@@ -1,25 +1,230 @@
+import asyncio
 import logging
 import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, Iterator, List
+import httpx
+import keyring
+from keyring.errors import PasswordDeleteError
+from degiro_connector.core.constants import urls
 from degiro_connector.trading.api import API as TradingAPI
 from degiro_connector.trading.models.credentials import Credentials
 from degiro_connector.core.exceptions import DeGiroConnectionError
 # from degiro_connector.trading.api import API
 # from degiro_connector.trading.actions.action_connect import ActionConnect
 from degiro_connector.trading.models.product_search import LookupRequest
+from Traffic_Recorder import RecordingTradingAPI, archive_from_env
+import Json_Codec
+
+try:
+    import h2  # noqa: F401  # httpx only negotiates HTTP/2 when h2 is installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.executed += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            logger.debug(f"Joined in-flight request: {key}")
+            return future.result()
+
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'executed': self.executed, 'deduplicated': self.deduplicated}
+
+
+class AdaptiveRateLimiter:
+    """AIMD concurrency control with backoff for requests sent to DeGiro.
+
+    The allowed number of concurrent requests grows by roughly one per window of
+    successful requests and is halved on HTTP 429/5xx or a latency spike.
+    Throttled requests are retried with jittered exponential backoff, honouring
+    Retry-After, during which all other requests are held back too.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 latency_threshold: float = 5.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_threshold = latency_threshold
+        self.throttle_events = 0
+        self.retries = 0
+        self._active = 0
+        self._blocked_until = 0.0
+        self._condition = threading.Condition()
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                wait = self._blocked_until - time.monotonic()
+                if wait <= 0 and self._active < int(self.limit):
+                    self._active += 1
+                    return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def _release(self, congested: bool):
+        with self._condition:
+            self._active -= 1
+            if congested:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int, retry_after: float = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        with self._condition:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        value = getattr(response, 'headers', {}).get('Retry-After')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def request(self, send):
+        """Call send() under the current limit, retrying throttled responses"""
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            start = time.monotonic()
+            try:
+                response = send()
+            except Exception:
+                self._release(congested=True)
+                raise
+            latency = time.monotonic() - start
+            throttled = response.status_code == 429 or response.status_code >= 500
+            self._release(congested=throttled or latency > self.latency_threshold)
+
+            if not throttled:
+                return response
+
+            with self._condition:
+                self.throttle_events += 1
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, self._retry_after(response))
+            with self._condition:
+                self.retries += 1
+            logger.warning(f"DeGiro throttled request (HTTP {response.status_code}), "
+                           f"limit now {int(self.limit)}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+        logger.error(f"DeGiro request still throttled after {self.max_retries} retries")
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'limit': int(self.limit),
+                'active': self._active,
+                'throttle_events': self.throttle_events,
+                'retries': self.retries
+            }
 
 
 class DegiroConnector:
-    def __init__(self, prompt_for_2fa_callback=None):
+    def __init__(self, prompt_for_2fa_callback=None, max_workers: int = 16, cache=None, rate_limiter=None,
+                 traffic_archive=None):
         self.trading_api = None
         self.session_id = None
         self.prompt_for_2fa_callback = prompt_for_2fa_callback
+        # Upper bound on simultaneous DeGiro requests issued by fetch_data
+        self.max_workers = max_workers
+        # Optional Disk_Cache.DiskCache holding profile/ratios payloads per ISIN
+        self.cache = cache
+        # Shares one request between concurrent callers asking for the same data
+        self.single_flight = SingleFlight()
+        # Adapts the number of concurrent requests to what DeGiro currently accepts
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(initial_limit=min(4, max_workers),
+                                                                max_limit=max_workers)
+        # Cleared while an interactive fetch_data runs so background work can back off
+        self.interactive_idle = threading.Event()
+        self.interactive_idle.set()
+        self._interactive_fetches = 0
+        self._interactive_lock = threading.Lock()
+        # Optional Traffic_Recorder.TrafficArchive recording or replaying all DeGiro traffic
+        self.traffic_archive = traffic_archive if traffic_archive is not None else archive_from_env()
+
+    KEYRING_SERVICE = "FinancialReportApp"
+    SESSION_KEYRING_KEY = "degiro_session"
+    SESSION_CONFIG_FILE = 'degiro_session_config.json'
+    # DeGiro drops trading sessions after 30 minutes without activity
+    SESSION_MAX_IDLE = TradingAPI.TRADING_TIMEOUT
+
+    def connect(self, username: str, password: str, reuse_session: bool = True) -> bool:
+        if self._replaying():
+            # Everything, including the config table, comes from the archive
+            self.trading_api = RecordingTradingAPI(None, self.traffic_archive)
+            self.config_table = self.traffic_archive.lookup('config', 'config_table')
+            logger.info("Replaying recorded DeGiro traffic")
+            return True
+
+        connected = self._connect(username, password, reuse_session)
+        if connected and self.traffic_archive is not None:
+            self.traffic_archive.store('config', 'config_table', self.config_table)
+            self.trading_api = RecordingTradingAPI(self.trading_api, self.traffic_archive)
+        return connected
+
+    def _replaying(self) -> bool:
+        return self.traffic_archive is not None and self.traffic_archive.mode == 'replay'
 
     # Updated connect() method in JSON_Grabber.py
-    def connect(self, username: str, password: str) -> bool:
+    def _connect(self, username: str, password: str, reuse_session: bool = True) -> bool:
         credentials = Credentials(
             username=username,
             password=password,
@@ -29,6 +234,9 @@ class DegiroConnector:
 
         self.trading_api = TradingAPI(credentials=credentials)
 
+        if reuse_session and self._restore_session(username):
+            return True
+
         try:
             # First connection attempt
             connect_result = self.trading_api.connect()
@@ -37,6 +245,7 @@ class DegiroConnector:
 
             # Get fresh config table after connection
             self.config_table = self.trading_api.get_config()
+            self._save_session(username)
             return True
 
         except DeGiroConnectionError as e:
@@ -45,31 +254,128 @@ class DegiroConnector:
                 if code:
                     credentials.one_time_password = code
                     self.trading_api = TradingAPI(credentials=credentials)
-                    return self.trading_api.connect()
+                    if self.trading_api.connect():
+                        self.config_table = self.trading_api.get_config()
+                        self._save_session(username)
+                        return True
+            return False
+
+    def _save_session(self, username: str):
+        """Persist the session id in the keyring and the config URLs on disk"""
+        try:
+            self.session_id = self.trading_api.connection_storage.session_id
+            session = {
+                'username': username,
+                'session_id': self.session_id,
+                'int_account': self.trading_api.credentials.int_account,
+                'saved_at': time.time()
+            }
+            keyring.set_password(self.KEYRING_SERVICE, self.SESSION_KEYRING_KEY, Json_Codec.dumps(session))
+            # The config table is too large for some keyring backends and only
+            # holds endpoint URLs, so it is stored next to the app without the session id.
+            config_table = {k: v for k, v in (self.config_table or {}).items() if k != 'sessionId'}
+            Json_Codec.dump(config_table, self.SESSION_CONFIG_FILE)
+        except Exception as e:
+            logger.warning(f"Could not persist DeGiro session: {str(e)}")
+
+    def _restore_session(self, username: str) -> bool:
+        """Reuse a saved session if it belongs to username and is still accepted"""
+        try:
+            saved = keyring.get_password(self.KEYRING_SERVICE, self.SESSION_KEYRING_KEY)
+            if not saved:
+                return False
+            session = Json_Codec.loads(saved)
+            if session.get('username') != username:
+                return False
+            if time.time() - session.get('saved_at', 0) > self.SESSION_MAX_IDLE:
+                logger.info("Saved DeGiro session expired, logging in again")
+                self.forget_session()
+                return False
+            config_table = Json_Codec.load(self.SESSION_CONFIG_FILE)
+
+            self.trading_api.connection_storage.session_id = session['session_id']
+            self.trading_api.credentials.int_account = session.get('int_account')
+
+            # Cheap authenticated call: returns None once DeGiro has dropped the session
+            if not self.trading_api.get_client_details():
+                logger.info("Saved DeGiro session rejected, logging in again")
+                self.trading_api.connection_storage.session_id = ""
+                self.forget_session()
+                return False
+
+            self.session_id = session['session_id']
+            self.config_table = config_table
+            self._save_session(username)  # Refresh the idle timestamp
+            logger.info("Reusing saved DeGiro session")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not restore DeGiro session: {str(e)}")
             return False
 
+    def forget_session(self):
+        try:
+            keyring.delete_password(self.KEYRING_SERVICE, self.SESSION_KEYRING_KEY)
+        except PasswordDeleteError:
+            pass
+        if os.path.exists(self.SESSION_CONFIG_FILE):
+            os.remove(self.SESSION_CONFIG_FILE)
+
     def prompt_for_2fa(self):
         return input("Enter your 2FA code: ")
 
-    def disconnect(self):
+    def disconnect(self, keep_session: bool = False):
+        """Log out, or with keep_session only refresh the saved session for the next start"""
+        if self._replaying():
+            self.trading_api = None
+            return
         if self.trading_api:
+            if keep_session and self.session_id:
+                self._save_session(self.trading_api.credentials.username)
+                logger.info("Kept DeGiro session for next start")
+                return
             self.trading_api.logout()
+            self.forget_session()
             logger.info("Logged out successfully")
 
-    def get_company_profile(self, isin: str) -> Dict[str, Any]:
+    def _cached(self, endpoint: str, isin: str, fetch, force_refresh: bool = False) -> Dict[str, Any]:
+        """Serve a payload from the cache, falling back to fetch(isin) on a miss"""
+        if self.cache is not None and not force_refresh:
+            payload = self.cache.get(endpoint, isin)
+            if payload is not None:
+                return payload
+        return self.single_flight.do((endpoint, isin), self._fetch_and_store, endpoint, isin, fetch)
+
+    def _fetch_and_store(self, endpoint: str, isin: str, fetch) -> Dict[str, Any]:
+        payload = fetch(isin)
+        if payload and self.cache is not None:  # Never cache the empty dict returned on errors
+            self.cache.set(endpoint, isin, payload)
+        return payload
+
+    def get_company_profile(self, isin: str, force_refresh: bool = False) -> Dict[str, Any]:
+        return self._cached('profile', isin, self._request_company_profile, force_refresh)
+
+    def get_company_ratios(self, isin: str, force_refresh: bool = False) -> Dict[str, Any]:
+        return self._cached('ratios', isin, self._request_company_ratios, force_refresh)
+
+    def _send_request(self, url: str, method: str = "GET"):
+        return self.rate_limiter.request(lambda: self.trading_api.request(url=url, method=method))
+
+    def _request_company_profile(self, isin: str) -> Dict[str, Any]:
         try:
             if not hasattr(self, 'config_table') or self.config_table is None:
                 raise AttributeError("config_table is not initialized. Call connect() first.")
             profile_url = self.config_table.get("refinitivCompanyProfileUrl")
-            response = self.trading_api.request(
-                url=f"{profile_url}/{isin}", method="GET"
-            )
-            return response.json() if response.status_code == 200 else {}
+            response = self._send_request(f"{profile_url}/{isin}")
+            if response.status_code == 200:
+                return Json_Codec.loads(response.content)
+            else:
+                logger.error(f"Failed to fetch profile for {isin}: HTTP {response.status_code}")
+                return {}
         except Exception as e:
             logger.error(f"Profile error: {str(e)}")
             return {}
 
-    def get_company_ratios(self, isin: str) -> Dict[str, Any]:
+    def _request_company_ratios(self, isin: str) -> Dict[str, Any]:
         try:
             # Defensive check: ensure config_table is initialized
             if not hasattr(self, 'config_table') or self.config_table is None:
@@ -79,12 +385,9 @@ class DegiroConnector:
             if not ratios_url:
                 raise ValueError("refinitivCompanyRatiosUrl not found in config_table.")
 
-            response = self.trading_api.request(
-                url=f"{ratios_url}/{isin}",
-                method="GET"
-            )
+            response = self._send_request(f"{ratios_url}/{isin}")
             if response.status_code == 200:
-                return response.json()
+                return Json_Codec.loads(response.content)
             else:
                 logger.error(f"Failed to fetch ratios for {isin}: HTTP {response.status_code}")
                 return {}
@@ -92,34 +395,234 @@ class DegiroConnector:
             logger.error(f"Ratios error: {str(e)}")
             return {}
 
-    def fetch_data(self, isin_codes: List[str]) -> Dict[str, Dict[str, Any]]:
-        results = {}
-        for isin in isin_codes:
-            results[isin] = {
-                'profile': self.get_company_profile(isin),
-                'ratios': self.get_company_ratios(isin)
+    def fetch_data(self, isin_codes: List[str], max_workers: int = None,
+                   force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Fetch profile and ratios for every ISIN, concurrently when max_workers > 1"""
+        self._set_interactive(True)
+        try:
+            return self._fetch_data(isin_codes, max_workers, force_refresh)
+        finally:
+            self._set_interactive(False)
+
+    def _set_interactive(self, active: bool):
+        with self._interactive_lock:
+            self._interactive_fetches += 1 if active else -1
+            if self._interactive_fetches:
+                self.interactive_idle.clear()
+            else:
+                self.interactive_idle.set()
+
+    def _fetch_data(self, isin_codes: List[str], max_workers: int = None,
+                    force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        max_workers = self.max_workers if max_workers is None else max_workers
+        isin_codes = list(dict.fromkeys(isin_codes))  # Drop duplicates, keep order
+
+        if max_workers <= 1 or not isin_codes:
+            results = {}
+            for isin in isin_codes:
+                results[isin] = {
+                    'profile': self.get_company_profile(isin, force_refresh),
+                    'ratios': self.get_company_ratios(isin, force_refresh)
+                }
+            self._log_fetch_stats()
+            return results
+
+        # Profile and ratios are submitted as separate jobs so both requests
+        # for one ISIN, and the requests for different ISINs, overlap.
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="degiro-fetch") as executor:
+            futures = {
+                isin: (executor.submit(self.get_company_profile, isin, force_refresh),
+                       executor.submit(self.get_company_ratios, isin, force_refresh))
+                for isin in isin_codes
+            }
+            results = {
+                isin: {
+                    'profile': profile_future.result(),
+                    'ratios': ratios_future.result()
+                }
+                for isin, (profile_future, ratios_future) in futures.items()
             }
+        logger.info(f"Fetched data for {len(results)} companies with {max_workers} workers")
+        self._log_fetch_stats()
         return results
 
+    def _log_fetch_stats(self):
+        if self.cache is not None:
+            stats = self.cache.stats()
+            logger.info(f"Payload cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+        stats = self.single_flight.stats()
+        logger.info(f"Requests: {stats['executed']} sent, {stats['deduplicated']} shared with an identical in-flight request")
+        stats = self.rate_limiter.stats()
+        logger.info(f"Rate limiter: concurrency limit {stats['limit']}, "
+                    f"{stats['throttle_events']} throttled responses, {stats['retries']} retries")
+
+    def search_companies(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        return self.single_flight.do(('search', query, limit, offset),
+                                     self._request_search_companies, query, limit, offset)
+
+    def iter_search_pages(self, query: str, page_size: int = 25, max_results: int = None,
+                          stop_when: Callable[[List[Dict[str, Any]]], bool] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield search results page by page as they arrive.
+
+        Stops when DeGiro returns a short page, once max_results have been
+        yielded, or as soon as stop_when(page) returns True for a yielded page.
+        """
+        offset = 0
+        yielded = 0
+        while max_results is None or yielded < max_results:
+            page = self.search_companies(query, limit=page_size, offset=offset)
+            if not page:
+                return
+            offset += len(page)
+            if max_results is not None:
+                page = page[:max_results - yielded]
+            yielded += len(page)
+            yield page
+            if len(page) < page_size or (stop_when and stop_when(page)):
+                return
 
-    def search_companies(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def _request_search_companies(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
         product_request = LookupRequest(
             search_text=query,
             limit=limit,
-            offset=0,
+            offset=offset,
             product_type_id=1,  # Assuming 1 is for stocks, adjust if needed
         )
         products_lookup = self.trading_api.product_search(product_request=product_request)
 
         if products_lookup and hasattr(products_lookup, 'products') and products_lookup.products:
-            return [
-                {
-                    'name': product['name'],
-                    'isin': product['isin'],
-                    'symbol': product['symbol'],
-                    'exchange': product['exchangeId']
-                }
-                for product in products_lookup.products
-            ]
+            return self._format_products(products_lookup.products)
         else:
-            return []  # Return an empty list if no results are found
\ No newline at end of file
+            return []  # Return an empty list if no results are found
+
+    @staticmethod
+    def _format_products(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'name': product['name'],
+                'isin': product['isin'],
+                'symbol': product['symbol'],
+                'exchange': product['exchangeId']
+            }
+            for product in products
+        ]
+
+
+class AsyncDegiroConnector:
+    """Asyncio counterpart of DegiroConnector.
+
+    Reuses the session id, credentials and config_table of an already connected
+    DegiroConnector, so no second login is needed. All requests share one pooled
+    httpx.AsyncClient (HTTP/2 when the h2 package is available).
+    """
+
+    def __init__(self, degiro_connector: DegiroConnector, max_connections: int = 100, timeout: float = 30.0):
+        self.degiro_connector = degiro_connector
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def config_table(self) -> Dict[str, Any]:
+        config_table = getattr(self.degiro_connector, 'config_table', None)
+        if config_table is None:
+            raise AttributeError("config_table is not initialized. Call connect() first.")
+        return config_table
+
+    def _build_client(self) -> httpx.AsyncClient:
+        trading_api = self.degiro_connector.trading_api
+        if trading_api is None:
+            raise AttributeError("DegiroConnector is not connected. Call connect() first.")
+
+        session_id = trading_api.connection_storage.session_id
+        headers = dict(trading_api.session_storage.session.headers)
+        headers['cookie'] = f"JSESSIONID={session_id}"
+
+        params = {"sessionId": session_id}
+        if trading_api.credentials.int_account is not None:
+            params["intAccount"] = trading_api.credentials.int_account
+
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            headers=headers,
+            params=params,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def _get_json(self, url: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        response = await self.client.get(url, params=params)
+        if response.status_code == 200:
+            return Json_Codec.loads(response.content)
+        logger.error(f"Failed to fetch {url}: HTTP {response.status_code}")
+        return {}
+
+    async def get_company_profile(self, isin: str) -> Dict[str, Any]:
+        try:
+            profile_url = self.config_table.get("refinitivCompanyProfileUrl")
+            return await self._get_json(f"{profile_url}/{isin}")
+        except Exception as e:
+            logger.error(f"Profile error: {str(e)}")
+            return {}
+
+    async def get_company_ratios(self, isin: str) -> Dict[str, Any]:
+        try:
+            ratios_url = self.config_table.get("refinitivCompanyRatiosUrl")
+            if not ratios_url:
+                raise ValueError("refinitivCompanyRatiosUrl not found in config_table.")
+            return await self._get_json(f"{ratios_url}/{isin}")
+        except Exception as e:
+            logger.error(f"Ratios error: {str(e)}")
+            return {}
+
+    async def fetch_data(self, isin_codes: List[str], max_concurrency: int = None) -> Dict[str, Dict[str, Any]]:
+        """Fetch profile and ratios for every ISIN on the running event loop"""
+        isin_codes = list(dict.fromkeys(isin_codes))
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_connections)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        async def fetch_one(isin):
+            profile, ratios = await asyncio.gather(
+                bounded(self.get_company_profile(isin)),
+                bounded(self.get_company_ratios(isin))
+            )
+            return isin, {'profile': profile, 'ratios': ratios}
+
+        pairs = await asyncio.gather(*(fetch_one(isin) for isin in isin_codes))
+        return dict(pairs)
+
+    async def search_companies(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        try:
+            product_request = LookupRequest(
+                search_text=query,
+                limit=limit,
+                offset=0,
+                product_type_id=1,
+            )
+            params = product_request.model_dump(by_alias=True, exclude_none=True, mode="json")
+            products_lookup = await self._get_json(urls.PRODUCT_SEARCH_LOOKUP, params=params)
+            return DegiroConnector._format_products(products_lookup.get('products') or [])
+        except Exception as e:
+            logger.error(f"Search error: {str(e)}")
+            return []
@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Any, Callable, Union
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+    logger.info("orjson not installed, falling back to the json module")
+
+
+def _orjson_options(indent: bool, sort_keys: bool) -> int:
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    if sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+    return options
+
+
+def _with_to_json(default: Callable = None) -> Callable:
+    """Serialize objects exposing to_json() (e.g. Generator.MetricRecord), then defer to default"""
+    def encode(obj):
+        to_json = getattr(obj, 'to_json', None)
+        if to_json is not None:
+            return to_json()
+        if default is not None:
+            return default(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return encode
+
+
+def dumps_bytes(obj: Any, indent: bool = False, sort_keys: bool = False, default: Callable = None) -> bytes:
+    """Serialize to UTF-8 JSON bytes; compact unless indent is set"""
+    default = _with_to_json(default)
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=default, option=_orjson_options(indent, sort_keys))
+        except TypeError as e:
+            # e.g. integers beyond 64 bits, which the json module still handles
+            logger.debug(f"orjson could not serialize, using json: {e}")
+    return _json_dumps(obj, indent, sort_keys, default).encode('utf-8')
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False, default: Callable = None) -> str:
+    """Serialize to a JSON string; compact unless indent is set"""
+    return dumps_bytes(obj, indent, sort_keys, default).decode('utf-8')
+
+
+def _json_dumps(obj, indent, sort_keys, default):
+    if indent:
+        return json.dumps(obj, indent=2, sort_keys=sort_keys, default=default, ensure_ascii=False)
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys, default=default, ensure_ascii=False)
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Parse JSON from str or bytes; raises ValueError on invalid input"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump(obj: Any, path: str, indent: bool = False, sort_keys: bool = False, default: Callable = None):
+    """Write obj to path as JSON bytes"""
+    with open(path, 'wb') as f:
+        f.write(dumps_bytes(obj, indent, sort_keys, default))
+
+
+def load(path: str) -> Any:
+    """Read a JSON file in one go"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def _synthetic_company(index: int) -> dict:
+    """compiled_company_data.json entry shaped like compare_selected_companies output"""
+    def metrics(keys):
+        return {key: [round(random.uniform(-50, 500), 4), 'Trailing 12 Months'] for key in keys}
+
+    periods = ['Trailing 12 Months', 'Annual', 'Most Recent Quarter', 'Last Fiscal Year']
+    return {
+        'company_name': f"Company {index}",
+        'isin': f"XX{index:010d}",
+        'financial_data': {
+            'company_overview': {
+                'legal_name': f"Company {index} N.V.",
+                'isin': f"XX{index:010d}",
+                'sector': random.choice(['Technology', 'Financials', 'Energy', 'Health Care']),
+                'industry': 'Software',
+                'country': 'NL',
+                'website': f"https://company{index}.example",
+                'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 8 + '...'
+            },
+            'financial_metrics': metrics(['revenue_per_share', 'eps', 'book_value_per_share',
+                                          'cash_per_share', 'free_cash_flow_per_share']),
+            'valuation_ratios': metrics(['pe_ratio', 'price_to_sales', 'price_to_book',
+                                         'price_to_cash_flow', 'price_to_free_cash_flow']),
+            'efficiency_metrics': metrics(['operating_margin', 'net_profit_margin',
+                                           'gross_margin', 'free_cash_flow_margin']),
+            'metric_periods': {f"metric_{m}": {p: random.uniform(0, 100) for p in periods} for m in range(14)}
+        }
+    }
+
+
+def _best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Benchmark the codec against json.dump(indent=4) on a large compiled company file"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--companies', type=int, default=5000, help="Number of synthetic companies")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    data = [_synthetic_company(i) for i in range(args.companies)]
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.json')
+        codec_path = os.path.join(tmp, 'codec.json')
+
+        def legacy_write():
+            with open(legacy_path, 'w') as f:
+                json.dump(data, f, indent=4)
+
+        def legacy_read():
+            with open(legacy_path, 'r') as f:
+                json.load(f)
+
+        results = [
+            ('json.dump(indent=4)', _best_of(args.repeat, legacy_write)),
+            ('json.load', _best_of(args.repeat, legacy_read)),
+            ('Json_Codec.dump', _best_of(args.repeat, lambda: dump(data, codec_path))),
+            ('Json_Codec.load', _best_of(args.repeat, lambda: load(codec_path))),
+        ]
+        sizes = (os.path.getsize(legacy_path), os.path.getsize(codec_path))
+
+    print(f"{args.companies} companies, orjson {'enabled' if ORJSON_AVAILABLE else 'not installed'}")
+    for name, seconds in results:
+        print(f"  {name:<22} {seconds * 1000:9.1f} ms")
+    print(f"  write speed-up {results[0][1] / results[2][1]:.1f}x, read speed-up {results[1][1] / results[3][1]:.1f}x")
+    print(f"  file size {sizes[0] / 1e6:.1f} MB -> {sizes[1] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
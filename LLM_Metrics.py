@@ -0,0 +1,107 @@
+import csv
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class LLMMetrics:
+    """Token, latency, cache and error accounting for every Perplexity call.
+
+    Each call is a row in a sqlite file tagged with the run it belongs to, so
+    cost and speed can be totalled per run or per day and split by model.
+    """
+
+    CALL_COLUMNS = ['run', 'day', 'timestamp', 'kind', 'model', 'prompt_tokens', 'completion_tokens',
+                    'latency', 'cache_hit', 'error']
+    SUMMARY_COLUMNS = ['period', 'model', 'calls', 'cache_hits', 'errors', 'prompt_tokens', 'completion_tokens',
+                       'avg_latency', 'max_latency']
+    GROUPINGS = ('run', 'day')
+
+    def __init__(self, path: str = 'llm_metrics.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS calls ("
+            " run TEXT NOT NULL,"
+            " day TEXT NOT NULL,"
+            " timestamp REAL NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " prompt_tokens INTEGER,"
+            " completion_tokens INTEGER,"
+            " latency REAL NOT NULL,"
+            " cache_hit INTEGER NOT NULL,"
+            " error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS calls_day ON calls (day)")
+        self._conn.commit()
+        self.start_run()
+
+    def start_run(self, label: str = None) -> str:
+        """Tag the following calls as a new run, e.g. one batch of reports"""
+        self.run = f"{datetime.now():%Y-%m-%d %H:%M:%S}" + (f" {label}" if label else "")
+        return self.run
+
+    def record(self, kind: str, model: str, latency: float, prompt_tokens: int = None,
+               completion_tokens: int = None, cache_hit: bool = False, error: str = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO calls (run, day, timestamp, kind, model, prompt_tokens, completion_tokens,"
+                " latency, cache_hit, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run, datetime.fromtimestamp(now).strftime('%Y-%m-%d'), now, kind, model,
+                 prompt_tokens, completion_tokens, latency, int(cache_hit), error)
+            )
+            self._conn.commit()
+        logger.debug(f"LLM call: {kind} {model} {latency:.2f}s, {prompt_tokens} prompt and "
+                     f"{completion_tokens} completion tokens, cache hit {cache_hit}, error {error}")
+
+    def calls(self) -> List[Dict[str, Any]]:
+        """Every recorded call, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.CALL_COLUMNS)} FROM calls ORDER BY timestamp"
+            ).fetchall()
+        return [dict(zip(self.CALL_COLUMNS, row)) for row in rows]
+
+    def summary(self, group_by: str = 'day') -> List[Dict[str, Any]]:
+        """Totals per run or per day and model, newest first.
+
+        Latencies only cover calls that reached the API and succeeded.
+        """
+        if group_by not in self.GROUPINGS:
+            raise ValueError(f"group_by must be one of {self.GROUPINGS}")
+        served = "cache_hit = 0 AND error IS NULL"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {group_by}, model, COUNT(*), SUM(cache_hit), COUNT(error),"
+                f" COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0),"
+                f" AVG(CASE WHEN {served} THEN latency END), MAX(CASE WHEN {served} THEN latency END)"
+                f" FROM calls GROUP BY {group_by}, model ORDER BY MAX(timestamp) DESC, model"
+            ).fetchall()
+        return [dict(zip(self.SUMMARY_COLUMNS, row)) for row in rows]
+
+    def export_csv(self, path: str, group_by: str = None) -> int:
+        """Write the calls, or the summary when group_by is given, to a CSV file; returns the row count"""
+        if group_by:
+            columns, rows = self.SUMMARY_COLUMNS, self.summary(group_by)
+        else:
+            columns, rows = self.CALL_COLUMNS, self.calls()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        logger.info(f"Exported {len(rows)} LLM metric rows to {path}")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,123 @@
+import argparse
+import logging
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import Json_Codec
+from Generator import DataProcessor
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _process_shard(shard: bytes) -> bytes:
+    """Worker: process {isin: payload} JSON bytes, return {isin: processed sections} as JSON bytes"""
+    results = {}
+    for isin, payload in Json_Codec.loads(shard).items():
+        try:
+            data_processor = DataProcessor({isin: payload})
+            data_processor.process_data()
+            results[isin] = data_processor.processed_data
+        except Exception as e:
+            logger.error(f"Processing failed for {isin}: {e}")
+    return Json_Codec.dumps_bytes(results)
+
+
+class ParallelDataProcessor:
+    """Runs DataProcessor for a large fetch_data result on a pool of worker processes.
+
+    The payloads are split into shards that travel to the workers as compact JSON
+    bytes, and the processed sections come back the same way, so neither side
+    pickles nested dicts. Small inputs are processed in-process.
+    """
+
+    def __init__(self, max_workers: int = None, shards_per_worker: int = 4, min_parallel: int = 200):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self.min_parallel = min_parallel
+        self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def _shards(self, all_data: Dict[str, Dict[str, Any]]):
+        items = list(all_data.items())
+        shard_size = max(1, math.ceil(len(items) / (self.max_workers * self.shards_per_worker)))
+        for start in range(0, len(items), shard_size):
+            yield Json_Codec.dumps_bytes(dict(items[start:start + shard_size]))
+
+    def process(self, all_data: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """{isin: processed_data} in input order; companies that fail to process are left out"""
+        start = time.perf_counter()
+        if self.max_workers == 1 or len(all_data) < self.min_parallel:
+            results = Json_Codec.loads(_process_shard(Json_Codec.dumps_bytes(all_data)))
+        else:
+            results = {}
+            for shard_result in self._executor().map(_process_shard, self._shards(all_data)):
+                results.update(Json_Codec.loads(shard_result))
+
+        processed = {}
+        for isin in all_data:
+            if isin in results:
+                processed[isin] = {section: DataProcessor._restore_section(section, data)
+                                   for section, data in results[isin].items()}
+        logger.info(f"Processed {len(processed)}/{len(all_data)} companies on {self.max_workers} workers "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return processed
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
+def _synthetic_payload(index: int) -> Dict[str, Any]:
+    """Profile and ratios shaped like the Refinitiv payloads, with every METRIC_MAP id"""
+    metric_ids = sorted({metric_id for ids in DataProcessor.METRIC_MAP.values() for metric_id in ids})
+    items = [{'id': metric_id, 'type': 'N', 'value': f"{random.uniform(0.1, 200):.4f}"} for metric_id in metric_ids]
+    items += [{'id': f"OTHER{n}", 'type': 'N', 'value': f"{random.uniform(0, 100):.2f}"} for n in range(120)]
+    groups = [{'name': f"Group {g}", 'items': items[g::8]} for g in range(8)]
+    return {
+        'profile': {'data': {'contacts': {'NAME': f"Company {index}", 'COUNTRY': 'NL'},
+                             'sector': 'Technology', 'description': 'Synthetic company'}},
+        'ratios': {'data': {'currentRatios': {'currency': 'EUR', 'ratiosGroups': groups}}}
+    }
+
+
+def main():
+    """Benchmark in-process against process-pool DataProcessor throughput on a synthetic screen"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--isins', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='*', help="Worker counts to try (default: 1, 2, 4, ... cpu_count)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    all_data = {f"XX{i:010d}": _synthetic_payload(i) for i in range(args.isins)}
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, cpu_count} | {2 ** n for n in range(1, 8) if 2 ** n < cpu_count})
+
+    baseline = None
+    for workers in worker_counts:
+        with ParallelDataProcessor(max_workers=workers, min_parallel=0) as processor:
+            start = time.perf_counter()
+            processor.process(all_data)
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:3d} workers: {elapsed:7.2f}s  {args.isins / elapsed:8.0f} ISIN/s  speed-up {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import ast
+import logging
+import time
+
+import polars as pl
+
+from Batch_Processor import BatchDataProcessor
+from Disk_Cache import DiskCache
+from Generator import DataProcessor
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class Screener:
+    """Filters and ranks every cached company in one vectorized pass.
+
+    Filters are Python-style expressions over DataProcessor.METRIC_MAP keys and
+    the overview columns, e.g. "pe_ratio < 15 and operating_margin > 20" or
+    "sector in ['Technology', 'Energy']". They are compiled to polars expressions,
+    so nothing but column names, literals, comparisons, arithmetic and
+    and/or/not is accepted. Companies missing a referenced metric never match.
+    """
+
+    TEXT_COLUMNS = ['isin'] + BatchDataProcessor.OVERVIEW_COLUMNS
+    COMPARISONS = {
+        ast.Lt: lambda a, b: a < b,
+        ast.LtE: lambda a, b: a <= b,
+        ast.Gt: lambda a, b: a > b,
+        ast.GtE: lambda a, b: a >= b,
+        ast.Eq: lambda a, b: a == b,
+        ast.NotEq: lambda a, b: a != b
+    }
+    OPERATORS = {
+        ast.Add: lambda a, b: a + b,
+        ast.Sub: lambda a, b: a - b,
+        ast.Mult: lambda a, b: a * b,
+        ast.Div: lambda a, b: a / b
+    }
+
+    def __init__(self, frame: pl.DataFrame):
+        self.frame = frame
+
+    @classmethod
+    def from_cache(cls, cache: DiskCache) -> 'Screener':
+        """Screener over every company with a cached profile or ratios payload"""
+        start = time.perf_counter()
+        profiles = dict(cache.items('profile'))
+        ratios = dict(cache.items('ratios'))
+        fetched = {isin: {'profile': profiles.get(isin, {}), 'ratios': ratios.get(isin, {})}
+                   for isin in dict.fromkeys([*profiles, *ratios])}
+        screener = cls(BatchDataProcessor(fetched).process())
+        logger.info(f"Screener loaded {len(fetched)} cached companies in {time.perf_counter() - start:.2f}s")
+        return screener
+
+    @property
+    def columns(self):
+        return self.TEXT_COLUMNS + list(DataProcessor.METRIC_MAP)
+
+    def compile(self, expression: str) -> pl.Expr:
+        """Translate a filter expression into a polars expression; raises ValueError, also for mixed types"""
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid screen expression: {e.msg}") from None
+        if self._kind(tree.body) != 'condition':
+            raise ValueError(f"Expected a condition such as pe_ratio < 15, got: {ast.unparse(tree.body)}")
+        return self._to_polars(tree.body)
+
+    def _column_kind(self, name: str) -> str:
+        dtype = self.frame.schema.get(name)
+        if dtype is None:
+            return 'text' if name in self.TEXT_COLUMNS else 'number'
+        return 'text' if dtype == pl.Utf8 else 'number'
+
+    def _kind(self, node) -> str:
+        """'number', 'text' or 'condition'; raises ValueError where polars would fail on mixed types"""
+        if isinstance(node, ast.BoolOp) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+            operands = node.values if isinstance(node, ast.BoolOp) else [node.operand]
+            for operand in operands:
+                if self._kind(operand) != 'condition':
+                    raise ValueError(f"'and', 'or' and 'not' need conditions, got: {ast.unparse(operand)}")
+            return 'condition'
+        if isinstance(node, ast.Compare):
+            left = self._kind(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not isinstance(comparator, (ast.List, ast.Tuple, ast.Set)):
+                        raise ValueError("'in' needs a list of values, e.g. sector in ['Technology']")
+                    kinds = {self._kind(element) for element in comparator.elts}
+                else:
+                    kinds = {self._kind(comparator)}
+                if left == 'condition' or kinds - {left}:
+                    raise ValueError(f"Cannot compare {left} with {' or '.join(sorted(kinds))}: "
+                                     f"{ast.unparse(node)}")
+                left = kinds.pop() if kinds else left
+            return 'condition'
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            operands = [node.left, node.right] if isinstance(node, ast.BinOp) else [node.operand]
+            for operand in operands:
+                if self._kind(operand) != 'number':
+                    raise ValueError(f"Arithmetic needs numbers, got: {ast.unparse(operand)}")
+            return 'number'
+        if isinstance(node, ast.Name):
+            return self._column_kind(node.id)
+        if isinstance(node, ast.Constant):
+            return 'text' if isinstance(node.value, str) else 'number'
+        # Anything else is rejected with a clearer message by _to_polars
+        return 'number'
+
+    def _to_polars(self, node):
+        if isinstance(node, ast.BoolOp):
+            values = [self._to_polars(value) for value in node.values]
+            combined = values[0]
+            for value in values[1:]:
+                combined = combined & value if isinstance(node.op, ast.And) else combined | value
+            return combined
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self._to_polars(node.operand)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self._to_polars(node.operand)
+        if isinstance(node, ast.Compare):
+            # Chained comparisons (10 < pe_ratio < 20) become a conjunction
+            left = self._to_polars(node.left)
+            result = None
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not isinstance(comparator, (ast.List, ast.Tuple, ast.Set)):
+                        raise ValueError("'in' needs a list of values, e.g. sector in ['Technology']")
+                    part = left.is_in([self._literal(element) for element in comparator.elts])
+                    part = ~part if isinstance(op, ast.NotIn) else part
+                    right = None
+                elif type(op) in self.COMPARISONS:
+                    right = self._to_polars(comparator)
+                    part = self.COMPARISONS[type(op)](left, right)
+                else:
+                    raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+                result = part if result is None else result & part
+                left = right
+            return result
+        if isinstance(node, ast.BinOp) and type(node.op) in self.OPERATORS:
+            return self.OPERATORS[type(node.op)](self._to_polars(node.left), self._to_polars(node.right))
+        if isinstance(node, ast.Name):
+            if node.id not in self.columns:
+                raise ValueError(f"Unknown column '{node.id}'. Use one of: {', '.join(self.columns)}")
+            return pl.col(node.id)
+        if isinstance(node, ast.Constant):
+            return pl.lit(self._literal(node))
+        raise ValueError(f"Unsupported expression: {ast.unparse(node)}")
+
+    @staticmethod
+    def _literal(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            return -node.operand.value
+        raise ValueError(f"Expected a number or text, got: {ast.unparse(node)}")
+
+    def screen(self, expression: str = None, order_by: str = None, descending: bool = True,
+               limit: int = 50) -> pl.DataFrame:
+        """Companies matching expression, ranked by order_by (nulls last), at most limit rows"""
+        if order_by and order_by not in self.columns:
+            raise ValueError(f"Unknown column '{order_by}'")
+        start = time.perf_counter()
+        query = self.frame.lazy()
+        if expression and expression.strip():
+            query = query.filter(self.compile(expression))
+        if order_by:
+            query = query.sort(order_by, descending=descending, nulls_last=True)
+        if limit:
+            query = query.head(limit)
+        try:
+            result = query.collect()
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(f"Screen '{expression}' failed: {e}") from None
+        logger.info(f"Screen '{expression}' matched {result.height} of {self.frame.height} companies "
+                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return result
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Optional, Tuple
+
+import Json_Codec
+from Generator import DataProcessor
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class SectorPercentileIndex:
+    """Per-sector and per-industry distributions of every METRIC_MAP metric.
+
+    Each distribution is a sorted list of the latest value per company, updated
+    in place as companies are (re)processed, so a percentile is a binary search
+    rather than a scan of the universe. The companies behind it are persisted
+    to path and the distributions are rebuilt on load.
+    """
+
+    SCOPES = ('industry', 'sector')
+
+    def __init__(self, path: str = 'sector_index.json', min_peers: int = 5):
+        self.path = path
+        self.min_peers = min_peers
+        self.companies = {}  # isin -> {'sector', 'industry', 'metrics': {key: value}}
+        self._distributions = {}  # (scope, group, key) -> sorted values
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            companies = Json_Codec.load(self.path)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error loading sector index: {e}")
+            return
+        for isin, entry in companies.items():
+            self._add(isin, entry)
+        for values in self._distributions.values():
+            values.sort()
+        logger.info(f"Sector index loaded with {len(self.companies)} companies")
+
+    def save(self):
+        try:
+            with self._lock:
+                Json_Codec.dump(self.companies, self.path)
+        except Exception as e:
+            logger.error(f"Error saving sector index: {e}")
+
+    def _add(self, isin: str, entry: Dict[str, Any], keep_sorted: bool = False):
+        self.companies[isin] = entry
+        for scope in self.SCOPES:
+            group = entry.get(scope)
+            if not group or group == 'N/A':
+                continue
+            for key, value in entry['metrics'].items():
+                values = self._distributions.setdefault((scope, group, key), [])
+                if keep_sorted:
+                    insort(values, value)
+                else:
+                    values.append(value)
+
+    def _remove(self, isin: str):
+        entry = self.companies.pop(isin, None)
+        if entry is None:
+            return
+        for scope in self.SCOPES:
+            for key, value in entry['metrics'].items():
+                values = self._distributions.get((scope, entry.get(scope), key))
+                if values:
+                    position = bisect_left(values, value)
+                    if position < len(values) and values[position] == value:
+                        del values[position]
+
+    def update(self, isin: str, sector: str, industry: str, metrics: Dict[str, Optional[float]]):
+        """Replace a company's contribution with its latest metric values"""
+        entry = {
+            'sector': sector,
+            'industry': industry,
+            'metrics': {key: float(value) for key, value in metrics.items()
+                        if key in DataProcessor.METRIC_MAP and isinstance(value, (int, float)) and value == value}
+        }
+        with self._lock:
+            if self.companies.get(isin) == entry:
+                return
+            self._remove(isin)
+            self._add(isin, entry, keep_sorted=True)
+
+    def update_processed(self, processed: Dict[str, Dict[str, Any]]):
+        """Index {isin: DataProcessor.processed_data}"""
+        for isin, processed_data in processed.items():
+            overview = processed_data.get('company_overview', {})
+            metrics = {}
+            for section in ['financial_metrics', 'valuation_ratios', 'efficiency_metrics']:
+                for key, (value, _) in processed_data.get(section, {}).items():
+                    metrics[key] = value
+            self.update(isin, overview.get('sector'), overview.get('industry'), metrics)
+
+    def update_frame(self, frame):
+        """Index a BatchDataProcessor frame"""
+        for row in frame.iter_rows(named=True):
+            self.update(row['isin'], row['sector'], row['industry'],
+                        {key: row[key] for key in DataProcessor.METRIC_MAP})
+
+    def peer_version(self, sector: str = None, industry: str = None) -> str:
+        """Content hash of the distributions percentile() would use for a company in sector and industry"""
+        digest = hashlib.sha1(str(self.min_peers).encode('utf-8'))
+        with self._lock:
+            for scope, group in zip(self.SCOPES, (industry, sector)):
+                digest.update(f"|{scope}:{group}".encode('utf-8'))
+                for key in DataProcessor.METRIC_MAP:
+                    values = self._distributions.get((scope, group, key), [])
+                    digest.update(f"|{key}:".encode('utf-8') + array('d', values).tobytes())
+        return digest.hexdigest()
+
+    def percentile(self, key: str, value: float, sector: str = None,
+                   industry: str = None) -> Optional[Tuple[float, str, int]]:
+        """(percentile 0-100, peer group, peer count) within the industry, else the sector.
+
+        None when neither group has min_peers values for the metric.
+        """
+        with self._lock:
+            for scope, group in zip(self.SCOPES, (industry, sector)):
+                values = self._distributions.get((scope, group, key))
+                if values and len(values) >= self.min_peers:
+                    # Mid-rank, so ties land in the middle of their run
+                    rank = (bisect_left(values, value) + bisect_right(values, value)) / 2
+                    return 100.0 * rank / len(values), group, len(values)
+        return None
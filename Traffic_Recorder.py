@@ -0,0 +1,212 @@
+import argparse
+import cProfile
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from typing import Any, Dict
+
+import Json_Codec
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_shared_archives = {}
+_shared_archives_lock = threading.Lock()
+
+
+class ReplayResponse:
+    """Minimal stand-in for requests.Response built from a recorded entry"""
+
+    def __init__(self, status_code: int, payload: Any = None, headers: Dict[str, str] = None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    @property
+    def text(self) -> str:
+        return self._payload if isinstance(self._payload, str) else Json_Codec.dumps(self._payload)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode('utf-8')
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code} (replayed)")
+
+
+class TrafficArchive:
+    """Records responses to a gzip'd JSON-lines archive and serves them back.
+
+    mode='record' appends every response passed to store(); mode='replay' loads
+    the archive and answers lookup() from it, optionally sleeping latency
+    seconds per call to mimic the network.
+    """
+
+    def __init__(self, path: str = 'traffic_archive.jsonl.gz', mode: str = 'record', latency: float = 0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown traffic archive mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.entries = {}
+        self.replay_misses = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        elif mode == 'replay':
+            raise FileNotFoundError(f"No traffic archive at {path}")
+
+    @staticmethod
+    def make_key(kind: str, request: Any) -> str:
+        canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+        return f"{kind}:{hashlib.sha1(canonical.encode('utf-8')).hexdigest()}"
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = Json_Codec.loads(line)
+                    self.entries[entry['key']] = entry
+        logger.info(f"Loaded {len(self.entries)} recorded responses from {self.path}")
+
+    def store(self, kind: str, request: Any, response: Any):
+        entry = {'key': self.make_key(kind, request), 'kind': kind, 'request': request, 'response': response}
+        with self._lock:
+            self.entries[entry['key']] = entry
+            # gzip members can be appended; readers see one continuous stream
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write(Json_Codec.dumps(entry, default=str) + '\n')
+
+    def lookup(self, kind: str, request: Any) -> Any:
+        if self.latency:
+            time.sleep(self.latency)
+        entry = self.entries.get(self.make_key(kind, request))
+        if entry is None:
+            with self._lock:
+                self.replay_misses += 1
+            logger.warning(f"No recorded {kind} response for {str(request)[:200]}")
+            return None
+        return entry['response']
+
+    def record_http(self, kind: str, request: Dict[str, Any], send) -> Any:
+        """Send (record mode) or replay (replay mode) one HTTP exchange"""
+        if self.mode == 'replay':
+            recorded = self.lookup(kind, request)
+            if recorded is None:
+                return ReplayResponse(404, {})
+            return ReplayResponse(recorded['status_code'], recorded['body'], recorded.get('headers'))
+
+        response = send()
+        try:
+            body = Json_Codec.loads(response.content)
+        except ValueError:
+            body = response.text
+        headers = {k: v for k, v in response.headers.items() if k.lower() == 'retry-after'}
+        self.store(kind, request, {'status_code': response.status_code, 'body': body, 'headers': headers})
+        return response
+
+    def recorded_isins(self):
+        isins = []
+        for entry in self.entries.values():
+            url = entry['request'].get('url', '') if entry['kind'] == 'degiro' else ''
+            if 'company-ratios/' in url or 'company-profile/' in url:
+                isins.append(url.rstrip('/').rsplit('/', 1)[-1])
+        return list(dict.fromkeys(isins))
+
+
+class _ReplayProductBatch:
+    def __init__(self, products):
+        self.products = products
+
+
+class RecordingTradingAPI:
+    """Proxy around a degiro_connector TradingAPI that records or replays its traffic"""
+
+    def __init__(self, trading_api, archive: TrafficArchive):
+        self._trading_api = trading_api
+        self._archive = archive
+
+    def request(self, url: str, method: str = "GET"):
+        return self._archive.record_http('degiro', {'method': method, 'url': url},
+                                         lambda: self._trading_api.request(url=url, method=method))
+
+    def product_search(self, product_request):
+        request = product_request.model_dump(by_alias=True, exclude_none=True, mode="json")
+        if self._archive.mode == 'replay':
+            return _ReplayProductBatch(self._archive.lookup('product_search', request))
+
+        products_lookup = self._trading_api.product_search(product_request=product_request)
+        products = getattr(products_lookup, 'products', None) if products_lookup else None
+        self._archive.store('product_search', request, products)
+        return products_lookup
+
+    def __getattr__(self, item):
+        if self._trading_api is None:
+            raise AttributeError(f"'{item}' is not available while replaying recorded traffic")
+        return getattr(self._trading_api, item)
+
+
+def archive_from_env():
+    """Shared archive configured by TRAFFIC_MODE / TRAFFIC_ARCHIVE / TRAFFIC_REPLAY_LATENCY, or None"""
+    mode = os.getenv('TRAFFIC_MODE', 'off').lower()
+    if mode in ('', 'off'):
+        return None
+    path = os.getenv('TRAFFIC_ARCHIVE', 'traffic_archive.jsonl.gz')
+    latency = float(os.getenv('TRAFFIC_REPLAY_LATENCY', '0') or 0)
+    with _shared_archives_lock:
+        if path not in _shared_archives:
+            _shared_archives[path] = TrafficArchive(path, mode=mode, latency=latency)
+            logger.info(f"Traffic archive enabled: {mode} {path}")
+        return _shared_archives[path]
+
+
+def main():
+    """Replay recorded traffic through fetch_data -> DataProcessor -> PDFGenerator under cProfile"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('isins', nargs='*', help="ISINs to process (default: every ISIN in the archive)")
+    parser.add_argument('--archive', default='traffic_archive.jsonl.gz')
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds of injected latency per response")
+    parser.add_argument('--with-ai', action='store_true', help="Also replay the recorded Perplexity analyses")
+    parser.add_argument('--top', type=int, default=30, help="Number of profile rows to print")
+    args = parser.parse_args()
+
+    # Imported here because both modules import this one
+    from JSON_Grabber import DegiroConnector
+    from Generator import DataProcessor, PDFGenerator, APIHandler
+
+    archive = TrafficArchive(args.archive, mode='replay', latency=args.latency)
+    connector = DegiroConnector(traffic_archive=archive)
+    connector.connect('', '')
+    api_handler = APIHandler()
+    api_handler.traffic_archive = archive
+    isins = args.isins or archive.recorded_isins()
+
+    def run_pipeline():
+        all_data = connector.fetch_data(isins)
+        for isin in isins:
+            data_processor = DataProcessor({isin: all_data[isin]})
+            data_processor.process_data()
+            company_name = data_processor.processed_data['company_overview']['legal_name']
+            ai_analysis = api_handler.get_individual_analysis(company_name) if args.with_ai else None
+            PDFGenerator(data_processor.processed_data, ai_analysis, company_name).generate_pdf()
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.runcall(run_pipeline)
+    print(f"Replayed {len(isins)} companies in {time.perf_counter() - start:.3f}s "
+          f"({archive.replay_misses} responses missing from the archive)")
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
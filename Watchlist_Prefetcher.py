@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import List
+
+import Json_Codec
+
+logging.basicConfig(filename='financial_report_app.log', level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class WatchlistPrefetcher:
+    """Keeps the DegiroConnector payload cache warm for a persistent watchlist.
+
+    A single daemon thread walks the watchlist every interval seconds and
+    refreshes profile and ratios entries that are missing or older than
+    refresh_after times their TTL. It sends one request at a time, stays within
+    max_requests_per_hour and waits whenever an interactive fetch_data is running.
+    """
+
+    ENDPOINTS = ('profile', 'ratios')
+
+    def __init__(self, degiro_connector, watchlist_file: str = 'watchlist.json', interval: float = 3600,
+                 max_requests_per_hour: int = 120, refresh_after: float = 0.8, request_delay: float = 1.0):
+        self.degiro_connector = degiro_connector
+        self.watchlist_file = watchlist_file
+        self.interval = interval
+        self.max_requests_per_hour = max_requests_per_hour
+        self.refresh_after = refresh_after
+        self.request_delay = request_delay
+        self.watchlist = self.load_watchlist()
+        self.prefetched = 0
+        self._request_times = deque()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def load_watchlist(self) -> List[str]:
+        try:
+            return Json_Codec.load(self.watchlist_file)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.error(f"Error loading watchlist: {e}")
+            return []
+
+    def set_watchlist(self, isin_codes: List[str]):
+        """Replace and persist the watchlist, and refresh it soon"""
+        self.watchlist = list(dict.fromkeys(isin_codes))
+        try:
+            Json_Codec.dump(self.watchlist, self.watchlist_file, indent=True)
+        except Exception as e:
+            logger.error(f"Error saving watchlist: {e}")
+        self._wake.set()
+
+    def start(self):
+        if self.degiro_connector.cache is None:
+            logger.warning("Watchlist prefetcher needs a DegiroConnector with a cache, not starting")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watchlist-prefetch", daemon=True)
+        self._thread.start()
+        logger.info(f"Watchlist prefetcher started for {len(self.watchlist)} companies")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    logger.info(f"Prefetched {refreshed} payloads for the watchlist")
+            except Exception as e:
+                logger.error(f"Watchlist prefetch failed: {e}")
+            self._wake.wait(timeout=self.interval)
+            self._wake.clear()
+
+    def _is_stale(self, endpoint: str, isin: str) -> bool:
+        cache = self.degiro_connector.cache
+        age = cache.age(endpoint, isin)
+        return age is None or age > cache.ttl_for(endpoint) * self.refresh_after
+
+    def _wait_for_budget(self) -> bool:
+        """Block until a request fits in the hourly budget; False when stopping"""
+        while not self._stop.is_set():
+            now = time.monotonic()
+            while self._request_times and now - self._request_times[0] > 3600:
+                self._request_times.popleft()
+            if len(self._request_times) < self.max_requests_per_hour:
+                return True
+            self._stop.wait(timeout=3600 - (now - self._request_times[0]))
+        return False
+
+    def _wait_for_idle(self) -> bool:
+        """Block while interactive fetches run; False when stopping"""
+        while not self._stop.is_set():
+            if self.degiro_connector.interactive_idle.wait(timeout=1.0):
+                return True
+        return False
+
+    def run_once(self) -> int:
+        """Refresh every stale watchlist entry once; returns the number of requests sent"""
+        fetchers = {
+            'profile': self.degiro_connector.get_company_profile,
+            'ratios': self.degiro_connector.get_company_ratios
+        }
+        sent = 0
+        for isin in list(self.watchlist):
+            for endpoint in self.ENDPOINTS:
+                if not self._is_stale(endpoint, isin):
+                    continue
+                if not self._wait_for_budget() or not self._wait_for_idle():
+                    return sent
+                self._request_times.append(time.monotonic())
+                fetchers[endpoint](isin, force_refresh=True)
+                sent += 1
+                self.prefetched += 1
+                # Leave room for interactive requests between background ones
+                if self._stop.wait(timeout=self.request_delay):
+                    return sent
+        return sent